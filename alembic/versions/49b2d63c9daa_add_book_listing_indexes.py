@@ -0,0 +1,32 @@
+"""add book listing indexes
+
+Revision ID: 49b2d63c9daa
+Revises: 43053869f21c
+Create Date: 2026-10-17 09:12:40.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '49b2d63c9daa'
+down_revision: Union[str, None] = '43053869f21c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_books_title_id', 'books', ['title', 'id'], unique=False)
+    op.create_index('ix_books_author_id', 'books', ['author', 'id'], unique=False)
+    op.create_index('ix_books_publication_year', 'books', ['publication_year'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_publication_year', table_name='books')
+    op.drop_index('ix_books_author_id', table_name='books')
+    op.drop_index('ix_books_title_id', table_name='books')
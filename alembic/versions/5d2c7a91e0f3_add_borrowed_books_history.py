@@ -0,0 +1,43 @@
+"""add borrowed books history
+
+Revision ID: 5d2c7a91e0f3
+Revises: b8e41d07c5a2
+Create Date: 2026-10-17 15:21:48.093117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2c7a91e0f3'
+down_revision: Union[str, None] = 'b8e41d07c5a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Monthly partitions are created by the archive job as it needs them
+    op.create_table('borrowed_books_history',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('borrow_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('reader_id', sa.Integer(), nullable=False),
+    sa.Column('return_date', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ),
+    sa.ForeignKeyConstraint(['reader_id'], ['readers.id'], ),
+    sa.PrimaryKeyConstraint('id', 'borrow_date'),
+    postgresql_partition_by='RANGE (borrow_date)'
+    )
+    op.create_index('ix_borrowed_books_history_reader', 'borrowed_books_history', ['reader_id', 'borrow_date', 'id'], unique=False)
+    op.create_index('ix_borrowed_books_history_book', 'borrowed_books_history', ['book_id', 'borrow_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_borrowed_books_history_book', table_name='borrowed_books_history')
+    op.drop_index('ix_borrowed_books_history_reader', table_name='borrowed_books_history')
+    op.drop_table('borrowed_books_history')
@@ -0,0 +1,53 @@
+"""add borrowing stats tables
+
+Revision ID: 6e1b0c4f9a73
+Revises: a3f6c8d2e417
+Create Date: 2026-10-17 17:10:36.205914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e1b0c4f9a73'
+down_revision: Union[str, None] = 'a3f6c8d2e417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The tables start empty; `python -m app.cli rebuild-stats` fills them from existing borrows
+    op.create_table('book_borrow_stats',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('borrow_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ),
+    sa.PrimaryKeyConstraint('book_id')
+    )
+    op.create_index('ix_book_borrow_stats_count', 'book_borrow_stats', ['borrow_count', 'book_id'], unique=False)
+    op.create_table('reader_borrow_stats',
+    sa.Column('reader_id', sa.Integer(), nullable=False),
+    sa.Column('borrow_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['reader_id'], ['readers.id'], ),
+    sa.PrimaryKeyConstraint('reader_id')
+    )
+    op.create_index('ix_reader_borrow_stats_count', 'reader_borrow_stats', ['borrow_count', 'reader_id'], unique=False)
+    op.create_table('daily_borrow_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('shard', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('borrows', sa.Integer(), nullable=False),
+    sa.Column('returns', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'shard')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_borrow_stats')
+    op.drop_index('ix_reader_borrow_stats_count', table_name='reader_borrow_stats')
+    op.drop_table('reader_borrow_stats')
+    op.drop_index('ix_book_borrow_stats_count', table_name='book_borrow_stats')
+    op.drop_table('book_borrow_stats')
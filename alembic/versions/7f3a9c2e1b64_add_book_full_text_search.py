@@ -0,0 +1,68 @@
+"""add book full text search
+
+Revision ID: 7f3a9c2e1b64
+Revises: 49b2d63c9daa
+Create Date: 2026-10-17 10:05:12.581934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3a9c2e1b64'
+down_revision: Union[str, None] = '49b2d63c9daa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Generated column: PostgreSQL keeps the vector current on every write
+        op.execute(
+            "ALTER TABLE books ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'C')) STORED"
+        )
+        op.execute("CREATE INDEX ix_books_search_vector ON books USING gin (search_vector)")
+    elif dialect == 'sqlite':
+        # External-content FTS5 table maintained by triggers on books
+        op.execute(
+            "CREATE VIRTUAL TABLE books_fts USING fts5("
+            "title, author, description, content='books', content_rowid='id')"
+        )
+        op.execute(
+            "CREATE TRIGGER books_fts_ai AFTER INSERT ON books BEGIN "
+            "INSERT INTO books_fts(rowid, title, author, description) "
+            "VALUES (new.id, new.title, new.author, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER books_fts_ad AFTER DELETE ON books BEGIN "
+            "INSERT INTO books_fts(books_fts, rowid, title, author, description) "
+            "VALUES ('delete', old.id, old.title, old.author, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER books_fts_au AFTER UPDATE OF title, author, description ON books BEGIN "
+            "INSERT INTO books_fts(books_fts, rowid, title, author, description) "
+            "VALUES ('delete', old.id, old.title, old.author, old.description); "
+            "INSERT INTO books_fts(rowid, title, author, description) "
+            "VALUES (new.id, new.title, new.author, new.description); END"
+        )
+        op.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_books_search_vector")
+        op.execute("ALTER TABLE books DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS books_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS books_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS books_fts_ai")
+        op.execute("DROP TABLE IF EXISTS books_fts")
@@ -0,0 +1,56 @@
+"""add due dates and job watermarks
+
+Revision ID: a3f6c8d2e417
+Revises: 5d2c7a91e0f3
+Create Date: 2026-10-17 16:02:11.482305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f6c8d2e417'
+down_revision: Union[str, None] = '5d2c7a91e0f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Loan period assumed for borrows made before due dates were recorded
+BACKFILL_LOAN_DAYS = 14
+
+
+def _backfill_due_date(table: str) -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        due = f"borrow_date + interval '{BACKFILL_LOAN_DAYS} days'"
+    else:
+        # Same text format as SQLAlchemy writes, so comparisons stay lexicographic
+        due = f"strftime('%Y-%m-%d %H:%M:%f000', borrow_date, '+{BACKFILL_LOAN_DAYS} days')"
+    op.execute(f"UPDATE {table} SET due_date = {due} WHERE due_date IS NULL")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('borrowed_books', sa.Column('due_date', sa.DateTime(timezone=True), nullable=True))
+    _backfill_due_date('borrowed_books')
+    op.create_index('ix_borrowed_books_active_due_date', 'borrowed_books', ['due_date', 'id'], unique=False,
+                    postgresql_where=sa.text('return_date IS NULL'), sqlite_where=sa.text('return_date IS NULL'))
+    op.add_column('borrowed_books_history', sa.Column('due_date', sa.DateTime(timezone=True), nullable=True))
+    _backfill_due_date('borrowed_books_history')
+    op.create_table('job_watermarks',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('position_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('position_id', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('job_watermarks')
+    op.drop_column('borrowed_books_history', 'due_date')
+    op.drop_index('ix_borrowed_books_active_due_date', table_name='borrowed_books',
+                  postgresql_where=sa.text('return_date IS NULL'), sqlite_where=sa.text('return_date IS NULL'))
+    op.drop_column('borrowed_books', 'due_date')
@@ -0,0 +1,31 @@
+"""add book version and updated_at
+
+Revision ID: b8e41d07c5a2
+Revises: e53b80ff9d22
+Create Date: 2026-10-17 13:05:12.418236
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e41d07c5a2'
+down_revision: Union[str, None] = 'e53b80ff9d22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('books', sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE books SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'updated_at')
+    op.drop_column('books', 'version')
@@ -0,0 +1,35 @@
+"""add reader search indexes
+
+Revision ID: c7d4e9a1f2b8
+Revises: 6e1b0c4f9a73
+Create Date: 2026-10-17 18:24:05.917342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d4e9a1f2b8'
+down_revision: Union[str, None] = '6e1b0c4f9a73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # text_pattern_ops lets LIKE 'prefix%' use the index under any collation
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE INDEX ix_readers_lower_name ON readers (lower(name) text_pattern_ops, id)")
+        op.execute("CREATE INDEX ix_readers_lower_email ON readers (lower(email) text_pattern_ops, id)")
+    else:
+        op.create_index('ix_readers_lower_name', 'readers', [sa.text('lower(name)'), 'id'], unique=False)
+        op.create_index('ix_readers_lower_email', 'readers', [sa.text('lower(email)'), 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_readers_lower_email', table_name='readers')
+    op.drop_index('ix_readers_lower_name', table_name='readers')
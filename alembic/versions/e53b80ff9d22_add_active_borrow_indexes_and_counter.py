@@ -0,0 +1,39 @@
+"""add active borrow indexes and counter
+
+Revision ID: e53b80ff9d22
+Revises: 7f3a9c2e1b64
+Create Date: 2026-10-17 11:40:27.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e53b80ff9d22'
+down_revision: Union[str, None] = '7f3a9c2e1b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('readers', sa.Column('active_borrow_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE readers SET active_borrow_count = ("
+        "SELECT count(*) FROM borrowed_books "
+        "WHERE borrowed_books.reader_id = readers.id AND borrowed_books.return_date IS NULL)"
+    )
+    op.create_index('ix_borrowed_books_active_reader_id', 'borrowed_books', ['reader_id'], unique=False,
+                    postgresql_where=sa.text('return_date IS NULL'), sqlite_where=sa.text('return_date IS NULL'))
+    op.create_index('ix_borrowed_books_active_book_id', 'borrowed_books', ['book_id'], unique=False,
+                    postgresql_where=sa.text('return_date IS NULL'), sqlite_where=sa.text('return_date IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_borrowed_books_active_book_id', table_name='borrowed_books')
+    op.drop_index('ix_borrowed_books_active_reader_id', table_name='borrowed_books')
+    op.drop_column('readers', 'active_borrow_count')
@@ -0,0 +1,73 @@
+"""fold reader search keys
+
+Revision ID: f2a7b3c91d05
+Revises: c7d4e9a1f2b8
+Create Date: 2026-10-17 21:02:11.483920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7b3c91d05'
+down_revision: Union[str, None] = 'c7d4e9a1f2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+readers = sa.table(
+    'readers', sa.column('id'), sa.column('name'), sa.column('email'), sa.column('name_folded'), sa.column('email_folded')
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_readers_lower_email', table_name='readers')
+    op.drop_index('ix_readers_lower_name', table_name='readers')
+    op.add_column('readers', sa.Column('name_folded', sa.String(), nullable=True))
+    op.add_column('readers', sa.Column('email_folded', sa.String(), nullable=True))
+
+    # Folded in Python, like new readers: SQLite's lower() only folds ASCII
+    bind = op.get_bind()
+    update = (
+        readers.update()
+        .where(readers.c.id == sa.bindparam('reader_id'))
+        .values(name_folded=sa.bindparam('folded_name'), email_folded=sa.bindparam('folded_email'))
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(readers.c.id, readers.c.name, readers.c.email)
+            .where(readers.c.id > last_id).order_by(readers.c.id).limit(10000)
+        ).all()
+        if not rows:
+            break
+        bind.execute(update, [
+            {'reader_id': row.id, 'folded_name': row.name.casefold(), 'folded_email': row.email.casefold()} for row in rows
+        ])
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('readers') as batch_op:
+        batch_op.alter_column('name_folded', existing_type=sa.String(), nullable=False)
+        batch_op.alter_column('email_folded', existing_type=sa.String(), nullable=False)
+    op.create_index('ix_readers_name_folded', 'readers', ['name_folded', 'id'], unique=False,
+                    postgresql_ops={'name_folded': 'text_pattern_ops'})
+    op.create_index('ix_readers_email_folded', 'readers', ['email_folded', 'id'], unique=False,
+                    postgresql_ops={'email_folded': 'text_pattern_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_readers_email_folded', table_name='readers')
+    op.drop_index('ix_readers_name_folded', table_name='readers')
+    with op.batch_alter_table('readers') as batch_op:
+        batch_op.drop_column('email_folded')
+        batch_op.drop_column('name_folded')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE INDEX ix_readers_lower_name ON readers (lower(name) text_pattern_ops, id)")
+        op.execute("CREATE INDEX ix_readers_lower_email ON readers (lower(email) text_pattern_ops, id)")
+    else:
+        op.create_index('ix_readers_lower_name', 'readers', [sa.text('lower(name)'), 'id'], unique=False)
+        op.create_index('ix_readers_lower_email', 'readers', [sa.text('lower(email)'), 'id'], unique=False)
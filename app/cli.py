@@ -0,0 +1,69 @@
+"""Maintenance commands.
+
+    python -m app.cli archive-borrows [--batch-size 1000] [--older-than-days 0]
+    python -m app.cli scan-overdue [--batch-size 500]
+    python -m app.cli rebuild-stats [--batch-size 10000] [--days-per-batch 31]
+"""
+import argparse
+import asyncio
+from datetime import timedelta
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal, async_engine
+
+
+async def archive_borrows(args):
+    from app.core.archive import archive_returned_borrows
+
+    async with AsyncSessionLocal() as db:
+        moved = await archive_returned_borrows(db, args.batch_size, timedelta(days=args.older_than_days))
+    print(f"Archived {moved} returned borrows")
+
+
+async def scan_overdue(args):
+    from app.core.overdue import scan_overdue, sender_from_settings
+
+    async with AsyncSessionLocal() as db:
+        sent = await scan_overdue(db, sender_from_settings(), args.batch_size)
+    print(f"Sent {sent} overdue notices")
+
+
+async def rebuild_stats(args):
+    from app.core.analytics import rebuild_stats
+
+    async with AsyncSessionLocal() as db:
+        counted = await rebuild_stats(db, args.batch_size, args.days_per_batch)
+    print(f"Rebuilt borrowing stats from {counted} borrows")
+
+
+async def run(args):
+    try:
+        await args.command(args)
+    finally:
+        await async_engine.dispose()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Library API maintenance commands")
+    commands = parser.add_subparsers(required=True)
+
+    archive = commands.add_parser("archive-borrows", help="move returned borrows into borrowed_books_history")
+    archive.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    archive.add_argument("--older-than-days", type=int, default=settings.ARCHIVE_AFTER_DAYS)
+    archive.set_defaults(command=archive_borrows)
+
+    overdue = commands.add_parser("scan-overdue", help="notify readers about borrows that became overdue")
+    overdue.add_argument("--batch-size", type=int, default=settings.OVERDUE_SCAN_BATCH_SIZE)
+    overdue.set_defaults(command=scan_overdue)
+
+    stats = commands.add_parser("rebuild-stats", help="recompute the borrowing analytics tables from scratch")
+    stats.add_argument("--batch-size", type=int, default=10000, help="book or reader ids per transaction")
+    stats.add_argument("--days-per-batch", type=int, default=31)
+    stats.set_defaults(command=rebuild_stats)
+
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
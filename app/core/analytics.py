@@ -0,0 +1,166 @@
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import Date, DateTime, cast, delete, func, literal, null, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import BookBorrowStats, BorrowedBook, BorrowedBookHistory, DailyBorrowStats, ReaderBorrowStats
+
+UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Rows per day in daily_borrow_stats; borrows and returns of different readers
+# mostly land on different rows and do not wait on each other's locks
+DAILY_STATS_SHARDS = 8
+
+
+def _shard(reader_id: int) -> int:
+    return reader_id % DAILY_STATS_SHARDS
+
+
+# Days are local dates. The routes write naive local timestamps; PostgreSQL
+# hands them back timezone-aware, so those are converted back to local time
+# first and a rebuilt day matches the live one.
+def stats_day(value: datetime) -> date:
+    return (value.astimezone() if value.tzinfo is not None else value).date()
+
+
+# Adds the counter columns of rows onto the existing rows with the same keys,
+# in one multi-row upsert. Rows are sorted by key so that concurrent
+# transactions lock them in the same order.
+async def _increment(db: AsyncSession, model, keys: tuple, rows: list):
+    if not rows:
+        return
+    rows.sort(key=lambda row: tuple(row[key] for key in keys))
+    statement = UPSERT_DIALECTS[db.get_bind().dialect.name](model).values(rows)
+    counters = [name for name in rows[0] if name not in keys]
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={name: getattr(model, name) + getattr(statement.excluded, name) for name in counters},
+    ))
+
+
+# Called by the borrow routes, before their commit, with
+# (book_id, reader_id, borrow_date) of every new borrow
+async def record_borrows(db: AsyncSession, borrows: list):
+    books, readers, days = Counter(), Counter(), Counter()
+    for book_id, reader_id, borrow_date in borrows:
+        books[book_id] += 1
+        readers[reader_id] += 1
+        days[(stats_day(borrow_date), _shard(reader_id))] += 1
+    await _increment(db, BookBorrowStats, ("book_id",), [
+        {"book_id": book_id, "borrow_count": count} for book_id, count in books.items()
+    ])
+    await _increment(db, ReaderBorrowStats, ("reader_id",), [
+        {"reader_id": reader_id, "borrow_count": count} for reader_id, count in readers.items()
+    ])
+    await _increment(db, DailyBorrowStats, ("day", "shard"), [
+        {"day": day, "shard": shard, "borrows": count, "returns": 0} for (day, shard), count in days.items()
+    ])
+
+
+# Called by the return routes with (reader_id, return_date) of every closed borrow
+async def record_returns(db: AsyncSession, returns: list):
+    days = Counter((stats_day(return_date), _shard(reader_id)) for reader_id, return_date in returns)
+    await _increment(db, DailyBorrowStats, ("day", "shard"), [
+        {"day": day, "shard": shard, "borrows": 0, "returns": count} for (day, shard), count in days.items()
+    ])
+
+
+# Keys of book_borrow_stats and reader_borrow_stats, and days of
+# daily_borrow_stats, are reconciled a range at a time. One statement reads the
+# true counts next to the stored ones, so both come from the same snapshot,
+# and the difference is added with the upsert the live routes use. A borrow
+# committed in between is counted by its own increment, so the rebuild neither
+# waits for live borrows nor makes them wait beyond one short batch.
+async def _rebuild_counts(db: AsyncSession, model, key: str, batch_size: int) -> int:
+    stored_key = getattr(model, key)
+    tops = [await db.scalar(select(func.max(getattr(source, key)))) for source in (BorrowedBook, BorrowedBookHistory, model)]
+    counted = 0
+    for low in range(0, max(filter(None, tops), default=0), batch_size):
+        high = low + batch_size
+        parts = [
+            select(getattr(source, key).label("key"), func.count().label("actual"), literal(0).label("stored"))
+            .where(getattr(source, key) > low, getattr(source, key) <= high)
+            .group_by(getattr(source, key))
+            for source in (BorrowedBook, BorrowedBookHistory)
+        ]
+        parts.append(select(stored_key, literal(0), model.borrow_count).where(stored_key > low, stored_key <= high))
+        counts = union_all(*parts).subquery()
+        rows = (await db.execute(
+            select(counts.c.key, func.sum(counts.c.actual).label("actual"), func.sum(counts.c.stored).label("stored"))
+            .group_by(counts.c.key)
+        )).all()
+        await _increment(db, model, (key,), [
+            {key: row.key, "borrow_count": row.actual - row.stored} for row in rows if row.actual != row.stored
+        ])
+        await db.execute(delete(model).where(stored_key > low, stored_key <= high, model.borrow_count == 0))
+        await db.commit()
+        counted += sum(row.actual for row in rows)
+    return counted
+
+
+def _events(source, kind: str, column, low: datetime, high: datetime):
+    return select(
+        literal(kind).label("kind"), source.reader_id, column.label("at"),
+        cast(null(), Date).label("day"), literal(0).label("shard"), literal(0).label("borrows"), literal(0).label("returns"),
+    ).where(column >= low, column < high)
+
+
+async def _rebuild_daily(db: AsyncSession, days_per_batch: int):
+    firsts = [await db.scalar(select(func.min(source.borrow_date))) for source in (BorrowedBook, BorrowedBookHistory)]
+    firsts = [stats_day(first) for first in firsts if first is not None]
+    first_stored, last_stored = (await db.execute(select(func.min(DailyBorrowStats.day), func.max(DailyBorrowStats.day)))).one()
+    first = min(filter(None, [*firsts, first_stored]), default=None)
+    if first is None:
+        return
+    last = max(filter(None, [date.today(), last_stored]))
+
+    start = first
+    while start <= last:
+        end = start + timedelta(days=days_per_batch)
+        # Local midnights, the clock stats_day buckets by
+        low, high = datetime.combine(start, time()), datetime.combine(end, time())
+        parts = [
+            _events(source, kind, getattr(source, column), low, high)
+            for source in (BorrowedBook, BorrowedBookHistory)
+            for kind, column in (("borrow", "borrow_date"), ("return", "return_date"))
+        ]
+        parts.append(select(
+            literal("stored"), literal(0), cast(null(), DateTime(timezone=True)),
+            DailyBorrowStats.day, DailyBorrowStats.shard, DailyBorrowStats.borrows, DailyBorrowStats.returns,
+        ).where(DailyBorrowStats.day >= start, DailyBorrowStats.day < end))
+
+        actual, stored = Counter(), Counter()
+        for row in (await db.execute(union_all(*parts))).all():
+            if row.kind == "stored":
+                stored[(row.day, row.shard, "borrow")] += row.borrows
+                stored[(row.day, row.shard, "return")] += row.returns
+            else:
+                actual[(stats_day(row.at), _shard(row.reader_id), row.kind)] += 1
+        deltas = {}
+        for day, shard, kind in actual.keys() | stored.keys():
+            delta = actual[(day, shard, kind)] - stored[(day, shard, kind)]
+            if delta:
+                deltas.setdefault((day, shard), {"day": day, "shard": shard, "borrows": 0, "returns": 0})[kind + "s"] = delta
+        await _increment(db, DailyBorrowStats, ("day", "shard"), list(deltas.values()))
+        await db.execute(delete(DailyBorrowStats).where(
+            DailyBorrowStats.day >= start, DailyBorrowStats.day < end,
+            DailyBorrowStats.borrows == 0, DailyBorrowStats.returns == 0,
+        ))
+        await db.commit()
+        start = end
+
+
+async def rebuild_stats(db: AsyncSession, batch_size: int = 10000, days_per_batch: int = 31) -> int:
+    """Recomputes the analytics tables from borrowed_books and
+    borrowed_books_history and corrects the stored numbers by the difference,
+    batch_size book or reader ids or days_per_batch days per transaction. It
+    can run while the library is open: live borrows and returns keep
+    incrementing the same rows and are neither lost nor counted twice. Two
+    rebuilds must not run at once, each would apply the correction. Returns the
+    number of borrows counted."""
+    counted = await _rebuild_counts(db, BookBorrowStats, "book_id", batch_size)
+    await _rebuild_counts(db, ReaderBorrowStats, "reader_id", batch_size)
+    await _rebuild_daily(db, days_per_batch)
+    return counted
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import BorrowedBook, BorrowedBookHistory
+
+ARCHIVE_COLUMNS = ("id", "borrow_date", "book_id", "reader_id", "due_date", "return_date")
+
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _next_month(value: datetime) -> datetime:
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+# Monthly partitions of borrowed_books_history covering [first, last]
+def month_partitions(first: datetime, last: datetime) -> list:
+    partitions = []
+    start = _month_start(first)
+    while start <= last.replace(tzinfo=None):
+        end = _next_month(start)
+        partitions.append((f"borrowed_books_history_{start:%Y_%m}", start, end))
+        start = end
+    return partitions
+
+
+async def ensure_month_partitions(db: AsyncSession, first: datetime, last: datetime):
+    for name, start, end in month_partitions(first, last):
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF borrowed_books_history "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d} 00:00:00+00') TO ('{end:%Y-%m-%d} 00:00:00+00')"
+        ))
+
+
+async def archive_returned_borrows(db: AsyncSession, batch_size: int = 1000, older_than: timedelta = timedelta(0)) -> int:
+    """Moves borrows returned before now - older_than from borrowed_books into
+    borrowed_books_history, batch_size rows per transaction. Returns the number
+    of rows moved."""
+    # Routes write naive local timestamps, so the cutoff is naive too
+    cutoff = datetime.now() - older_than
+    postgresql = db.get_bind().dialect.name == "postgresql"
+    moved = 0
+    while True:
+        # SKIP LOCKED lets the job run next to returns that are still in flight
+        ids = (await db.scalars(
+            select(BorrowedBook.id)
+            .where(BorrowedBook.return_date != None, BorrowedBook.return_date <= cutoff)
+            .order_by(BorrowedBook.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )).all()
+        if not ids:
+            break
+        if postgresql:
+            first, last = (await db.execute(
+                select(func.min(BorrowedBook.borrow_date), func.max(BorrowedBook.borrow_date))
+                .where(BorrowedBook.id.in_(ids))
+            )).one()
+            await ensure_month_partitions(db, first, last)
+
+        columns = [getattr(BorrowedBook, name) for name in ARCHIVE_COLUMNS]
+        await db.execute(
+            insert(BorrowedBookHistory).from_select(ARCHIVE_COLUMNS, select(*columns).where(BorrowedBook.id.in_(ids)))
+        )
+        await db.execute(delete(BorrowedBook).where(BorrowedBook.id.in_(ids)).execution_options(synchronize_session=False))
+        await db.commit()
+        moved += len(ids)
+        if len(ids) < batch_size:
+            break
+    return moved
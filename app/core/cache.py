@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded in-process cache; entries expire after a TTL and the least
+    recently used entry is evicted once the cache is full.
+
+    With a version backend (see response_cache.version_backend) every entry is
+    stamped with the generation it was computed under, and invalidate() makes
+    all entries stale in every worker sharing the backend."""
+
+    def __init__(self, maxsize: int, ttl: float, backend=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Read before computing a value, then passed to set(): an invalidation that
+    # lands in between bumps the generation and the value is never served
+    def generation(self) -> int:
+        return self.backend.current() if self.backend is not None else 0
+
+    def get(self, key):
+        generation = self.generation()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now or entry[1] != generation:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, ttl: float = None, generation: int = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        if generation is None:
+            generation = self.generation()
+        with self._lock:
+            self._entries[key] = (expires_at, generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard_where(self, predicate):
+        with self._lock:
+            stale = [key for key, (_, _, value) in self._entries.items() if predicate(value)]
+            for key in stale:
+                del self._entries[key]
+
+    def invalidate(self):
+        if self.backend is not None:
+            self.backend.bump()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,4 +1,6 @@
 import os
+from typing import Optional
+
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
@@ -10,4 +12,69 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     ALGORITHM: str
 
-settings = Settings()
\ No newline at end of file
+    # Authenticated users are cached per token to skip the user lookup
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10000
+    # Same format as CATALOGUE_CACHE_BACKEND; a shared backend makes a user
+    # change log the user out of every worker
+    USER_CACHE_BACKEND: str = "local"
+
+    # bcrypt cost factor; existing hashes are upgraded on the next login
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Connection pool of the async engines behind the routes, per engine.
+    # Pre-ping and recycling replace connections that died in a failover;
+    # DB_POOL_WARMUP connections are opened at startup.
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARMUP: int = 5
+
+    # Smaller responses are not worth the CPU of compressing them
+    GZIP_MINIMUM_SIZE: int = 1000
+
+    # Comma separated replica URLs for the read-only routes. A replica that
+    # fails to connect is skipped for REPLICA_RETRY_SECONDS. Pages read from a
+    # replica within REPLICA_MAX_LAG_SECONDS of a write are not cached.
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_RETRY_SECONDS: int = 30
+    REPLICA_MAX_LAG_SECONDS: float = 5
+
+    # Serialized GET /books pages; "local" or "sqlite:///path" to share
+    # invalidation between workers
+    CATALOGUE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    CATALOGUE_CACHE_BACKEND: str = "local"
+
+    # Opt-in log of statements slower than the threshold, with their plans
+    SLOW_QUERY_LOG_ENABLED: bool = False
+    SLOW_QUERY_THRESHOLD_MS: int = 200
+    SLOW_QUERY_LOG_PATH: str = "slow_queries.log"
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS: int = 5
+    SLOW_QUERY_PLAN_SAMPLE_SECONDS: int = 300
+
+    # Returned borrows are moved to borrowed_books_history once they are
+    # ARCHIVE_AFTER_DAYS old; the in-process job is off unless an interval is set
+    ARCHIVE_INTERVAL_SECONDS: int = 0
+    ARCHIVE_BATCH_SIZE: int = 1000
+    ARCHIVE_AFTER_DAYS: int = 0
+
+    # Loans are due LOAN_PERIOD_DAYS after borrowing. The overdue scanner hands
+    # newly overdue borrows to OVERDUE_SENDER ("file" or "smtp")
+    LOAN_PERIOD_DAYS: int = 14
+    OVERDUE_SCAN_INTERVAL_SECONDS: int = 0
+    OVERDUE_SCAN_BATCH_SIZE: int = 500
+    OVERDUE_SENDER: str = "file"
+    OVERDUE_NOTIFICATIONS_PATH: str = "overdue_notifications.log"
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 25
+    SMTP_FROM: str = "library@example.com"
+    SMTP_USERNAME: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_STARTTLS: bool = False
+
+settings = Settings()
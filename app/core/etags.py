@@ -0,0 +1,57 @@
+import hashlib
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+
+# fields names the columns of a sparse (?fields=) representation and is empty
+# for the full book; a sparse body is a different representation, so it gets
+# its own tag
+def book_etag(book_id: int, version: int, fields: tuple = ()) -> str:
+    if fields:
+        return f'"{book_id}.{version}.{hashlib.sha1(",".join(fields).encode()).hexdigest()[:8]}"'
+    return f'"{book_id}.{version}"'
+
+
+# Only tags of the full book parse. The W/ prefix the gzip middleware adds is
+# accepted: it marks a different content coding of the same version.
+def parse_book_etag(etag: str) -> Optional[tuple]:
+    try:
+        book_id, version = etag.strip().removeprefix("W/").strip('"').split(".")
+        return int(book_id), int(version)
+    except ValueError:
+        return None
+
+
+# Strong validator for a list response, derived from the (id, version) keys of
+# the rows it contains plus anything else that shapes the representation
+def collection_etag(keys, *parts) -> str:
+    digest = hashlib.sha1(repr((list(keys), parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+# If-None-Match uses weak comparison: W/ prefixes are ignored and "*" matches anything
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class WeakETagGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that turns the ETag of a compressed response into a weak
+    one. The routes tag the identity body; the same strong tag on the gzip body
+    would let caches and If-Range clients mix the two up. If-None-Match still
+    matches, since it compares weakly."""
+
+    async def __call__(self, scope, receive, send):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/") and headers.get("content-encoding") == "gzip":
+                    headers["ETag"] = "W/" + etag
+            await send(message)
+
+        await super().__call__(scope, receive, send_wrapper)
@@ -0,0 +1,17 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Runs job() every interval seconds until cancelled. A failing run is logged
+# and retried on the next tick instead of stopping the loop.
+async def run_periodically(name: str, interval: float, job):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = await job()
+            if result:
+                logger.info("%s processed %d rows", name, result)
+        except Exception:
+            logger.exception("%s failed", name)
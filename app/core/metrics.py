@@ -0,0 +1,227 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.query_budget import check_query_budget
+
+# Latency buckets in seconds and query-count buckets per request
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Requests that match no route share one label, so scans of random URLs can
+# not blow up the number of series
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def expose(self, kind: str = "counter") -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {kind}"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def expose(self) -> list:
+        return super().expose("gauge")
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self.values = {}
+
+    def observe(self, value: float, labels: tuple = ()):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def expose(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    # Collectors are called at scrape time and return extra exposition lines,
+    # for values that already live elsewhere (cache stats, pool stats)
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status")))
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route")))
+IN_PROGRESS = registry.register(Gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled.", ("method", "route")))
+REQUEST_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request.", ("method", "route"), QUERY_BUCKETS))
+REQUEST_DB_DURATION = registry.register(Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements per HTTP request.", ("method", "route")))
+QUERY_BUDGET_EXCEEDED = registry.register(Counter(
+    "http_request_query_budget_exceeded_total", "Requests that ran more SQL statements than their route's budget.",
+    ("method", "route")))
+
+
+class RequestStats:
+    __slots__ = ("route", "queries", "db_time")
+
+    def __init__(self, route: str = None):
+        self.route = route
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# Set by the middleware for the duration of a request. The async engine runs
+# statements in a greenlet that shares the request's context, so the cursor
+# events below can find it.
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if request_stats.get() is not None:
+        context._metrics_started_at = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = request_stats.get()
+    started = getattr(context, "_metrics_started_at", None)
+    if stats is not None and started is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+# Exposes a stats() dict as gauges named <prefix>_<key>, e.g. cache_hits{cache="users"}
+def stats_collector(prefix: str, labelname: str, sources: dict):
+    def collect() -> list:
+        samples = {}
+        for label, stats in sources.items():
+            for key, value in stats().items():
+                if isinstance(value, (int, float)):
+                    samples.setdefault(key, []).append(f'{prefix}_{key}{{{labelname}="{_escape(label)}"}} {value}')
+        lines = []
+        for key, series in samples.items():
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.extend(series)
+        return lines
+    return collect
+
+
+# Resolved before the request is handled so the in-progress gauge can carry
+# the route too. Only the path regex and method are checked, which is much
+# cheaper than Route.matches() building a child scope for every route.
+def route_template(scope) -> str:
+    app = scope.get("app")
+    if app is None:
+        return UNMATCHED_ROUTE
+    path, method = scope["path"], scope["method"]
+    partial = None
+    for route in app.router.routes:
+        if route.path_regex.match(path):
+            if route.methods is None or method in route.methods:
+                return route.path
+            if partial is None:
+                partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency, status codes, requests
+    in progress and SQL statements per request. Everything is updated from the
+    event loop thread, so plain dicts are enough."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels = (scope["method"], route_template(scope))
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats(labels[1])
+        token = request_stats.set(stats)
+        IN_PROGRESS.inc(labels)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_DURATION.observe(time.perf_counter() - started, labels)
+            IN_PROGRESS.dec(labels)
+            REQUESTS.inc(labels + (status_code,))
+            REQUEST_QUERIES.observe(stats.queries, labels)
+            REQUEST_DB_DURATION.observe(stats.db_time, labels)
+            request_stats.reset(token)
+        if check_query_budget(scope, labels[1], stats.queries):
+            QUERY_BUDGET_EXCEEDED.inc(labels)
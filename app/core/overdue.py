@@ -0,0 +1,156 @@
+import asyncio
+import json
+import smtplib
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from email.message import EmailMessage
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.analytics import UPSERT_DIALECTS
+from app.core.config import settings
+from app.core.pagination import keyset_after
+from app.models.models import Book, BorrowedBook, JobWatermark, Reader
+
+WATERMARK_NAME = "overdue_scan"
+
+
+@dataclass
+class OverdueNotice:
+    borrow_id: int
+    reader_name: str
+    reader_email: str
+    book_title: str
+    due_date: datetime
+
+
+class FileSender:
+    """Appends notices as JSON lines; the local stand-in for email."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, notices: List[OverdueNotice]):
+        with open(self.path, "a") as f:
+            for notice in notices:
+                f.write(json.dumps(asdict(notice), default=str) + "\n")
+
+    async def send(self, notices: List[OverdueNotice]):
+        await asyncio.to_thread(self._write, notices)
+
+
+class SMTPSender:
+    """Emails each reader over one SMTP connection per batch."""
+
+    def __init__(self, host: str, port: int, from_addr: str, username: str = None, password: str = None,
+                 starttls: bool = False):
+        self.host = host
+        self.port = port
+        self.from_addr = from_addr
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+
+    def _message(self, notice: OverdueNotice) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.from_addr
+        message["To"] = notice.reader_email
+        message["Subject"] = f"Overdue: {notice.book_title}"
+        message.set_content(
+            f"Dear {notice.reader_name},\n\n"
+            f'"{notice.book_title}" was due on {notice.due_date:%Y-%m-%d}. Please return it to the library.\n'
+        )
+        return message
+
+    def _send(self, notices: List[OverdueNotice]):
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for notice in notices:
+                smtp.send_message(self._message(notice))
+
+    async def send(self, notices: List[OverdueNotice]):
+        await asyncio.to_thread(self._send, notices)
+
+
+def sender_from_settings():
+    if settings.OVERDUE_SENDER == "smtp":
+        return SMTPSender(
+            settings.SMTP_HOST, settings.SMTP_PORT, settings.SMTP_FROM,
+            settings.SMTP_USERNAME, settings.SMTP_PASSWORD, settings.SMTP_STARTTLS,
+        )
+    if settings.OVERDUE_SENDER == "file":
+        return FileSender(settings.OVERDUE_NOTIFICATIONS_PATH)
+    raise ValueError(f"Unsupported overdue sender: {settings.OVERDUE_SENDER}")
+
+
+# Locks the scan's watermark row for the current transaction, creating it on
+# the first run. Returns None while another scan holds it. On SQLite the insert
+# takes the database write lock, so a concurrent scan waits for the batch to
+# commit instead and then reads the watermark that batch left behind.
+async def _lock_watermark(db: AsyncSession) -> Optional[JobWatermark]:
+    await db.execute(
+        UPSERT_DIALECTS[db.get_bind().dialect.name](JobWatermark)
+        .values(name=WATERMARK_NAME)
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    return await db.scalar(
+        select(JobWatermark)
+        .where(JobWatermark.name == WATERMARK_NAME)
+        .with_for_update(skip_locked=True)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def scan_overdue(db: AsyncSession, sender, batch_size: int = 500, now: datetime = None) -> int:
+    """Hands borrows that became overdue since the last scan to the sender.
+
+    Only rows after the persisted (due_date, id) watermark are read, walking the
+    partial index on active borrows, so the cost depends on how many borrows
+    went overdue rather than on the size of the table. Each batch is read, sent
+    and the watermark advanced while the watermark row is locked, so scans
+    running in several workers at once never send the same notice twice; a
+    scan that finds the row locked stops and leaves the rest to its owner. A
+    failed send is retried by the next scan. Returns the number of notices
+    sent."""
+    # Routes write naive local timestamps, so the comparison point is naive too
+    now = now or datetime.now()
+
+    sent = 0
+    while True:
+        watermark = await _lock_watermark(db)
+        if watermark is None:
+            break
+        query = (
+            select(BorrowedBook.id, BorrowedBook.due_date, Reader.name, Reader.email, Book.title)
+            .join(Reader, Reader.id == BorrowedBook.reader_id)
+            .join(Book, Book.id == BorrowedBook.book_id)
+            .where(BorrowedBook.return_date == None, BorrowedBook.due_date <= now)
+            .order_by(BorrowedBook.due_date, BorrowedBook.id)
+            .limit(batch_size)
+        )
+        if watermark.position_date is not None:
+            query = query.where(keyset_after(
+                BorrowedBook.due_date, BorrowedBook.id, watermark.position_date, watermark.position_id
+            ))
+        rows = (await db.execute(query)).all()
+        if not rows:
+            break
+
+        await sender.send([
+            OverdueNotice(borrow_id=row.id, reader_name=row.name, reader_email=row.email,
+                          book_title=row.title, due_date=row.due_date)
+            for row in rows
+        ])
+        watermark.position_date, watermark.position_id = rows[-1].due_date, rows[-1].id
+        await db.commit()
+        sent += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    await db.commit()
+    return sent
@@ -0,0 +1,31 @@
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values: dict) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+# Rows strictly after (value, last_id) in the given order. Comparing the
+# (sort key, id) pair keeps the predicate index-friendly and breaks ties on id.
+def keyset_after(column, id_column, value, last_id, descending: bool = False):
+    if column is id_column:
+        return id_column < last_id if descending else id_column > last_id
+    if descending:
+        return tuple_(column, id_column) < tuple_(value, last_id)
+    return tuple_(column, id_column) > tuple_(value, last_id)
@@ -0,0 +1,119 @@
+import logging
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+# Checkouts are normally sub-millisecond; the upper buckets catch queueing
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CHECKOUT_WAIT = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time to check a connection out of the pool.", ("pool",), WAIT_BUCKETS))
+CHECKOUT_TIMEOUTS = registry.register(Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after the pool timeout.", ("pool",)))
+
+# name -> pool of every monitored engine, for /admin/pool and /metrics
+monitored_pools = {}
+
+
+class MonitoredQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that times every checkout, including the wait for a
+    free connection, and counts checkouts that time out."""
+
+    monitor_name = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            CHECKOUT_TIMEOUTS.inc((self.monitor_name,))
+            raise
+        CHECKOUT_WAIT.observe(time.perf_counter() - started, (self.monitor_name,))
+        return connection
+
+    # engine.dispose() swaps in a fresh pool built by recreate()
+    def recreate(self):
+        pool = super().recreate()
+        pool.monitor_name = self.monitor_name
+        monitored_pools[self.monitor_name] = pool
+        return pool
+
+    def stats(self) -> dict:
+        counts, total = CHECKOUT_WAIT.values.get((self.monitor_name,), ([0] * (len(WAIT_BUCKETS) + 1), 0.0))
+        cumulative, histogram = 0, {}
+        for bound, count in zip(WAIT_BUCKETS + ("+Inf",), counts):
+            cumulative += count
+            histogram[str(bound)] = cumulative
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "max_overflow": self._max_overflow,
+            "checkouts": cumulative,
+            "checkout_wait_seconds_total": total,
+            "checkout_timeouts": CHECKOUT_TIMEOUTS.values.get((self.monitor_name,), 0),
+            "checkout_wait_histogram": histogram,
+        }
+
+
+# create_async_engine() keyword arguments from the DB_POOL_* settings. An
+# in-memory SQLite database lives in a single connection, so it keeps the
+# dialect's default pool.
+def pool_options(url) -> dict:
+    url = make_url(url)
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING, "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS}
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return options
+    return {
+        **options,
+        "poolclass": MonitoredQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
+
+def monitor_pool(name: str, engine):
+    pool = engine.sync_engine.pool
+    if isinstance(pool, MonitoredQueuePool):
+        pool.monitor_name = name
+        monitored_pools[name] = pool
+
+
+def pool_stats() -> dict:
+    return {name: pool.stats() for name, pool in monitored_pools.items()}
+
+
+# Gauges for /metrics; the histogram and timeout counter are registered above
+def collect_pool_stats() -> list:
+    stats = pool_stats()
+    lines = []
+    for key in ("size", "checked_in", "checked_out", "overflow"):
+        lines.append(f"# TYPE db_pool_{key} gauge")
+        for name, values in stats.items():
+            lines.append(f'db_pool_{key}{{pool="{name}"}} {values[key]}')
+    return lines
+
+
+async def warm_up(engine, connections: int):
+    """Opens up to `connections` pooled connections at startup, so the first
+    requests do not pay for connection setup. A database that is not reachable
+    yet is only logged; the pool connects on demand later."""
+    held = []
+    try:
+        for _ in range(connections):
+            held.append(await engine.connect())
+    except Exception as error:
+        logger.warning("Pool warm-up stopped after %d connections: %s", len(held), error)
+    finally:
+        for connection in held:
+            await connection.close()
+    return len(held)
@@ -0,0 +1,72 @@
+import logging
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Off in production, where an overrun is only logged and counted; the test
+# suite turns it on so that an overrun fails the test that caused it
+enforce = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+# Counts the SQL statements executed inside the block, on one engine or, by
+# default, on every engine
+@contextmanager
+def count_queries(engine=Engine):
+    counter = QueryCounter()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+# Declares the most statements a route may run per request, including the
+# user lookup behind get_current_user. Goes below the router decorator:
+#
+#     @router.get("/{book_id}")
+#     @query_budget(3)
+#     async def get_book(...):
+def query_budget(max_queries: int):
+    def decorate(endpoint):
+        endpoint.query_budget = max_queries
+        return endpoint
+    return decorate
+
+
+def route_budget(scope) -> Optional[int]:
+    endpoint = getattr(scope.get("route"), "endpoint", None)
+    return getattr(endpoint, "query_budget", None)
+
+
+# Called by the metrics middleware once the request is done; returns whether
+# the budget was exceeded
+def check_query_budget(scope, route: str, queries: int) -> bool:
+    budget = route_budget(scope)
+    if budget is None or queries <= budget:
+        return False
+    message = f"{scope['method']} {route} ran {queries} SQL statements, its budget is {budget}"
+    if enforce:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+    return True
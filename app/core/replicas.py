@@ -0,0 +1,69 @@
+import time
+
+from sqlalchemy import event
+
+
+class ReplicaSet:
+    """Read replicas handed out round-robin.
+
+    A replica whose connection fails or drops is taken out of the rotation
+    for retry_seconds and then tried again by the next request that reaches
+    it. When no replica is available choose() returns None and the caller
+    falls back to the primary."""
+
+    def __init__(self, engines: list, retry_seconds: float = 30, clock=time.monotonic):
+        self.engines = list(engines)
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        self.reads = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self._next = 0
+        # index -> clock() until which the replica is skipped
+        self._down_until = {}
+        for index, engine in enumerate(self.engines):
+            event.listen(engine.sync_engine, "handle_error", self._on_error(index))
+
+    def _on_error(self, index: int):
+        def handle_error(context):
+            # Only connection failures count; a bad statement says nothing about the replica
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(index)
+        return handle_error
+
+    def mark_down(self, index: int):
+        self.failures += 1
+        self._down_until[index] = self.clock() + self.retry_seconds
+
+    def healthy(self, index: int) -> bool:
+        until = self._down_until.get(index)
+        if until is None:
+            return True
+        if self.clock() >= until:
+            del self._down_until[index]
+            return True
+        return False
+
+    def choose(self):
+        for _ in range(len(self.engines)):
+            index = self._next
+            self._next = (self._next + 1) % len(self.engines)
+            if self.healthy(index):
+                self.reads += 1
+                return self.engines[index]
+        if self.engines:
+            self.fallbacks += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self.engines),
+            "healthy": sum(1 for index in range(len(self.engines)) if self.healthy(index)),
+            "reads": self.reads,
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+        }
+
+    async def dispose(self):
+        for engine in self.engines:
+            await engine.dispose()
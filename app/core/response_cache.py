@@ -0,0 +1,176 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+
+
+class LocalVersionBackend:
+    """Generation counter private to this process; enough for a single worker."""
+
+    def __init__(self):
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        return self._version
+
+    def bump(self) -> int:
+        with self._lock:
+            self._version += 1
+            return self._version
+
+
+class SQLiteVersionBackend:
+    """Generation counter kept in a SQLite file, shared by every worker on the
+    host. Readers re-check the file at most once per poll_interval, so other
+    workers pick up a write within that window."""
+
+    def __init__(self, path: str, name: str = "catalogue", poll_interval: float = 0.5):
+        self.path = path
+        self.name = name
+        self.poll_interval = poll_interval
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+            connection.execute("INSERT OR IGNORE INTO cache_versions (name, version) VALUES (?, 0)", (self.name,))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def current(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            if self._version is None or now - self._checked_at >= self.poll_interval:
+                with self._connect() as connection:
+                    row = connection.execute(
+                        "SELECT version FROM cache_versions WHERE name = ?", (self.name,)
+                    ).fetchone()
+                self._version = row[0]
+                self._checked_at = now
+            return self._version
+
+    def bump(self) -> int:
+        with self._lock:
+            with self._connect() as connection:
+                row = connection.execute(
+                    "UPDATE cache_versions SET version = version + 1 WHERE name = ? RETURNING version",
+                    (self.name,),
+                ).fetchone()
+            self._version = row[0]
+            self._checked_at = time.monotonic()
+            return self._version
+
+
+# "local" keeps invalidation inside the process; "sqlite:///path/to/file.db"
+# shares it between workers on one host
+def version_backend(url: str, name: str = "catalogue"):
+    if url == "local":
+        return LocalVersionBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteVersionBackend(url[len("sqlite:///"):], name)
+    raise ValueError(f"Unsupported cache backend: {url}")
+
+
+class ResponseCache:
+    """LRU cache of serialized response bodies, bounded by their total size.
+
+    Every entry is stamped with the generation it was computed under. A write
+    bumps the generation in the shared backend, which makes all entries stale
+    in every worker at once without having to know which keys it affected."""
+
+    def __init__(self, max_bytes: int, backend):
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # monotonic time this process last saw the generation change
+        self.changed_at = None
+        self._generation = backend.current()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _drop_stale(self, generation: int):
+        # Called with the lock held
+        if generation != self._generation:
+            self._entries.clear()
+            self.size = 0
+            self._generation = generation
+            self.invalidations += 1
+            self.changed_at = time.monotonic()
+
+    # Read before querying the database, then passed to set(): a write that
+    # lands in between bumps the generation and the entry is never served
+    def generation(self) -> int:
+        return self.backend.current()
+
+    def get(self, key) -> Optional[tuple]:
+        generation = self.backend.current()
+        with self._lock:
+            self._drop_stale(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, generation: int, body: bytes, etag: str):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._drop_stale(self.backend.current())
+            if generation != self._generation:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            self._entries[key] = (body, etag)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self):
+        generation = self.backend.bump()
+        with self._lock:
+            self._drop_stale(generation)
+
+    # Whether nothing was written for the last `seconds`, i.e. a replica
+    # lagging at most that much has caught up with every write
+    def settled(self, seconds: float) -> bool:
+        generation = self.backend.current()
+        with self._lock:
+            self._drop_stale(generation)
+        return self.changed_at is None or time.monotonic() - self.changed_at >= seconds
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "generation": self._generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+catalogue_cache = ResponseCache(
+    max_bytes=settings.CATALOGUE_CACHE_MAX_BYTES,
+    backend=version_backend(settings.CATALOGUE_CACHE_BACKEND),
+)
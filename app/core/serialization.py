@@ -0,0 +1,84 @@
+import json
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+# UTC datetimes end in "Z", as pydantic writes them on the response_model path
+def _default(value):
+    if isinstance(value, datetime) and value.utcoffset() == timedelta(0):
+        return value.isoformat()[:-6] + "Z"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Encodes plain dicts/lists of column values straight to bytes. Output of the
+# fast path is built from trusted database columns, so it is not re-validated
+# through the response models.
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, separators=(",", ":"), default=_default).encode()
+
+
+def json_response(content, headers: dict = None) -> Response:
+    return Response(content=dumps(content), media_type="application/json", headers=headers)
+
+
+# Column tuples for a response model, in field order, for select(*columns(...)).
+# fields narrows them to a sparse fieldset from parse_fields().
+def model_columns(entity, model, fields: tuple = None) -> tuple:
+    return tuple(getattr(entity, name) for name in fields or model.model_fields)
+
+
+# Extra columns selected after the fields are left out of the dicts
+def rows_to_dicts(model, rows, fields: tuple = None) -> list:
+    fields = fields or tuple(model.model_fields)
+    return [dict(zip(fields, row)) for row in rows]
+
+
+# The ?fields=a,b sparse fieldset of a response model, in model order. "id" is
+# always part of it; without the parameter the default (or every field) is used.
+def parse_fields(model, fields: Optional[str], default: tuple = None) -> tuple:
+    if fields is None:
+        return default or tuple(model.model_fields)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(model.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return tuple(name for name in model.model_fields if name in requested or name == "id")
+
+
+# Most ids one multi-get may ask for, and the largest id that fits the
+# Integer primary keys on every supported database
+MAX_MULTI_GET_IDS = 500
+MAX_ID = 2**31 - 1
+
+
+# The ?ids=1,2,3 of a multi-get as ints, in request order without repeats
+def parse_ids(ids: str, max_ids: int = MAX_MULTI_GET_IDS) -> list:
+    try:
+        parsed = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma separated list of integers")
+    if not parsed:
+        raise HTTPException(status_code=400, detail="ids must not be empty")
+    if len(parsed) > max_ids:
+        raise HTTPException(status_code=400, detail=f"At most {max_ids} ids per request")
+    if not all(1 <= value <= MAX_ID for value in parsed):
+        raise HTTPException(status_code=400, detail=f"ids must be between 1 and {MAX_ID}")
+    return parsed
+
+
+# Rows fetched with an IN query, put back in the order the ids were asked for;
+# ids that do not exist are left out
+def order_by_ids(rows, ids: list) -> list:
+    by_id = {row.id: row for row in rows}
+    return [by_id[id_] for id_ in ids if id_ in by_id]
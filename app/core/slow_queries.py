@@ -0,0 +1,139 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+
+from app.core.metrics import request_stats
+
+EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+# Distinct statements remembered for plan sampling before the memory is reset
+MAX_FINGERPRINTS = 1000
+
+
+def _fingerprint(value: str) -> str:
+    return hashlib.sha1(value.encode()).hexdigest()[:12]
+
+
+# Types, not values: the log must not leak the data that was queried
+def parameter_shape(parameters, executemany: bool = False):
+    if executemany:
+        return {"rows": len(parameters), "row": parameter_shape(parameters[0]) if parameters else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+class SlowQueryLog:
+    """Logs statements slower than threshold_ms as JSON lines to a rotating file.
+
+    The plan is captured with EXPLAIN in a background task on the event loop,
+    so the slow request does not wait for it. A statement is explained at
+    most once per sample_seconds and only while fewer than max_pending
+    EXPLAINs are running. A plan that did not change since the last one
+    logged for the statement is referenced by its plan_id only."""
+
+    def __init__(self, engine, threshold_ms: float, path: str, max_bytes: int, backups: int,
+                 sample_seconds: float, max_pending: int = 4):
+        self.engine = engine
+        self.threshold = threshold_ms / 1000
+        self.sample_seconds = sample_seconds
+        self.max_pending = max_pending
+        self.explain_prefix = EXPLAIN_PREFIXES.get(engine.dialect.name)
+        # fingerprint -> (monotonic time of the last EXPLAIN, plan_id logged last)
+        self._plans = {}
+        self._tasks = set()
+
+        self.logger = logging.getLogger(f"{__name__}.{id(self)}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+        self.logger.addHandler(self.handler)
+
+    def install(self):
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self._before)
+        event.listen(self.engine.sync_engine, "after_cursor_execute", self._after)
+        return self
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_started_at = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started_at", None)
+        if started is None or context.execution_options.get("slow_query_explain"):
+            return
+        duration = time.perf_counter() - started
+        if duration < self.threshold:
+            return
+
+        stats = request_stats.get()
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "route": stats.route if stats is not None else None,
+            "sql": statement,
+            "params": parameter_shape(parameters, executemany),
+        }
+        fingerprint = _fingerprint(statement)
+        last_explained, plan_id = self._plans.get(fingerprint, (None, None))
+        now = time.monotonic()
+        sampled_out = last_explained is not None and now - last_explained < self.sample_seconds
+        explainable = (
+            self.explain_prefix is not None and not executemany
+            and statement.lstrip()[:6].upper().startswith(EXPLAINABLE)
+        )
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if sampled_out or not explainable or loop is None or len(self._tasks) >= self.max_pending:
+            record["plan_id"] = plan_id
+            self._write(record)
+            return
+
+        if len(self._plans) >= MAX_FINGERPRINTS:
+            self._plans.clear()
+        # Claimed now so that concurrent slow runs of the statement are not explained too
+        self._plans[fingerprint] = (now, plan_id)
+        # A fresh context keeps the EXPLAIN out of the request's statement counts
+        task = loop.create_task(self._explain(record, fingerprint, statement, parameters), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _explain(self, record: dict, fingerprint: str, statement: str, parameters):
+        try:
+            async with self.engine.connect() as connection:
+                connection = await connection.execution_options(slow_query_explain=True)
+                result = await connection.exec_driver_sql(self.explain_prefix + statement, parameters)
+                plan = [str(row[-1]) for row in result]
+        except Exception as exc:
+            record["plan_error"] = str(exc)
+            self._write(record)
+            return
+        plan_id = _fingerprint(json.dumps(plan))
+        if plan_id != self._plans.get(fingerprint, (None, None))[1]:
+            record["plan"] = plan
+        record["plan_id"] = plan_id
+        self._plans[fingerprint] = (time.monotonic(), plan_id)
+        self._write(record)
+
+    def _write(self, record: dict):
+        self.logger.info(json.dumps(record, default=str))
+
+    # Waits for EXPLAINs still running, e.g. before shutdown
+    async def drain(self):
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def close(self):
+        event.remove(self.engine.sync_engine, "before_cursor_execute", self._before)
+        event.remove(self.engine.sync_engine, "after_cursor_execute", self._after)
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
@@ -1,16 +1,73 @@
+import time
+from dataclasses import dataclass
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.models import User
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.response_cache import version_backend
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
+# Identity of the authenticated librarian, detached from any session
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    email: str
+
+# Decoded tokens mapped to the user they belong to. Entries never outlive the
+# token itself and go stale in every worker once a user row changes.
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS,
+    backend=version_backend(settings.USER_CACHE_BACKEND, "users"),
+)
+
+# Every cached user is dropped: user rows change rarely, and a generation bump
+# is the one signal the other workers can see
+def invalidate_users():
+    user_cache.invalidate()
+
+# Users changed by a flush, or by an ORM bulk UPDATE/DELETE on users, are
+# remembered on the session and invalidated once the transaction commits; until
+# then a concurrent lookup would still see, and cache, the old row. Statements
+# run on a Connection bypass the session and must call invalidate_users
+# themselves, otherwise a changed user stays cached for up to
+# USER_CACHE_TTL_SECONDS.
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    if any(isinstance(obj, User) for obj in (*session.dirty, *session.deleted)):
+        session.info["users_changed"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_changes(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        mapper.class_ is User for mapper in orm_execute_state.all_mappers
+    ):
+        orm_execute_state.session.info["users_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    if session.info.pop("users_changed", False):
+        invalidate_users()
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_changed_users(session, previous_transaction):
+    session.info.pop("users_changed", None)
+
 # Dependency to extract current user from token
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> CurrentUser:
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached
+    generation = user_cache.generation()
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -25,8 +82,14 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if user is None:
         raise credentials_exception
 
-    return user
+    identity = CurrentUser(id=user.id, email=user.email)
+    ttl = settings.USER_CACHE_TTL_SECONDS
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        user_cache.set(token, identity, ttl, generation)
+    return identity
@@ -1,9 +1,75 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
 from fastapi import FastAPI
-from app.routes import auth, books, borrow
+from fastapi.responses import PlainTextResponse
+from app.routes import admin, auth, books, borrow, stats
+from app.core.hashing import password_hasher
+from app.database import AsyncSessionLocal, async_engine, replica_engines, replicas, slow_query_log
+from app.core.archive import archive_returned_borrows
+from app.core.config import settings
+from app.core.etags import WeakETagGZipMiddleware
+from app.core.jobs import run_periodically
+from app.core.metrics import MetricsMiddleware, registry, stats_collector
+from app.core.overdue import scan_overdue, sender_from_settings
+from app.core.pool import collect_pool_stats, warm_up
+from app.core.query_budget import query_budget
+from app.core.response_cache import catalogue_cache
+from app.dependencies.dependencies import user_cache
+
+async def archive_job():
+    async with AsyncSessionLocal() as db:
+        return await archive_returned_borrows(
+            db, settings.ARCHIVE_BATCH_SIZE, timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+        )
+
+async def overdue_job():
+    async with AsyncSessionLocal() as db:
+        return await scan_overdue(db, sender_from_settings(), settings.OVERDUE_SCAN_BATCH_SIZE)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Beyond the pool size, connections would only be closed again on checkin
+    connections = min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE)
+    await asyncio.gather(*(warm_up(engine, connections) for engine in [async_engine, *replica_engines]))
+    jobs = []
+    if settings.ARCHIVE_INTERVAL_SECONDS > 0:
+        jobs.append(asyncio.create_task(run_periodically("archive", settings.ARCHIVE_INTERVAL_SECONDS, archive_job)))
+    if settings.OVERDUE_SCAN_INTERVAL_SECONDS > 0:
+        jobs.append(asyncio.create_task(
+            run_periodically("overdue scan", settings.OVERDUE_SCAN_INTERVAL_SECONDS, overdue_job)
+        ))
+    yield
+    for job in jobs:
+        job.cancel()
+    await asyncio.gather(*jobs, return_exceptions=True)
+    if slow_query_log is not None:
+        await slow_query_log.drain()
+    password_hasher.shutdown()
+    await replicas.dispose()
+    await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+# Responses of at least GZIP_MINIMUM_SIZE bytes are compressed for clients
+# that send Accept-Encoding: gzip, with weak ETags; the metrics middleware
+# stays outermost
+app.add_middleware(WeakETagGZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE)
+app.add_middleware(MetricsMiddleware)
+
+registry.add_collector(stats_collector("cache", "cache", {"catalogue": catalogue_cache.stats, "users": user_cache.stats}))
+registry.add_collector(stats_collector("db_replicas", "role", {"read": replicas.stats}))
+registry.add_collector(collect_pool_stats)
 
-app = FastAPI()
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+@query_budget(0)
+async def metrics():
+    return PlainTextResponse(registry.expose(), media_type="text/plain; version=0.0.4")
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(books.router, prefix="/books", tags=["Books"])
-app.include_router(borrow.router, tags=["Borrowing"])
\ No newline at end of file
+app.include_router(borrow.router, tags=["Borrowing"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
+app.include_router(stats.router, prefix="/stats", tags=["Stats"])
\ No newline at end of file
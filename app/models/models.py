@@ -1,7 +1,11 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, func, UniqueConstraint, Index, DDL, event, literal_column
 from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
 from app.database import Base
 
+def utcnow():
+    return datetime.now(timezone.utc)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -21,9 +25,62 @@ class Book(Base):
     copies = Column(Integer, default=1)
     # second alembic migration addition
     description = Column(String, nullable=True)
+    # Row version for ETags and If-Match. Every UPDATE of a book, ORM or Core,
+    # bumps it; ON CONFLICT upserts have to set both columns themselves.
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version") + 1)
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
 
     borrows = relationship("BorrowedBook", back_populates="book")
 
+    # Composite indexes back keyset pagination of the catalogue by each sort key
+    __table_args__ = (
+        Index("ix_books_title_id", "title", "id"),
+        Index("ix_books_author_id", "author", "id"),
+        Index("ix_books_publication_year", "publication_year"),
+    )
+
+
+# Full-text index over title, author and description. It lives outside the ORM
+# mapping (FTS5 table on SQLite, generated tsvector column on PostgreSQL) and is
+# kept in sync by the database itself; see migration 7f3a9c2e1b64.
+BOOK_SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5("
+        "title, author, description, content='books', content_rowid='id')",
+        "CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN "
+        "INSERT INTO books_fts(rowid, title, author, description) "
+        "VALUES (new.id, new.title, new.author, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN "
+        "INSERT INTO books_fts(books_fts, rowid, title, author, description) "
+        "VALUES ('delete', old.id, old.title, old.author, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author, description ON books BEGIN "
+        "INSERT INTO books_fts(books_fts, rowid, title, author, description) "
+        "VALUES ('delete', old.id, old.title, old.author, old.description); "
+        "INSERT INTO books_fts(rowid, title, author, description) "
+        "VALUES (new.id, new.title, new.author, new.description); END",
+    ],
+    "postgresql": [
+        "ALTER TABLE books ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'C')) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_books_search_vector ON books USING gin (search_vector)",
+    ],
+}
+
+for dialect_name, statements in BOOK_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Book.__table__, "after_create", DDL(statement).execute_if(dialect=dialect_name))
+event.listen(Book.__table__, "before_drop", DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect="sqlite"))
+
+
+# Default of a column holding the case-folded value of another one, computed
+# in Python because SQLite's lower() only folds ASCII
+def folded(column: str):
+    def default(context):
+        return context.get_current_parameters()[column].casefold()
+    return default
+
 
 class Reader(Base):
     __tablename__ = "readers"
@@ -31,9 +88,22 @@ class Reader(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=False)
+    # Search keys for the reader directory; readers are never renamed, so
+    # they are only set on insert
+    name_folded = Column(String, nullable=False, default=folded("name"))
+    email_folded = Column(String, nullable=False, default=folded("email"))
+    # Denormalized count of unreturned borrows, maintained by borrow and return
+    active_borrow_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     borrows = relationship("BorrowedBook", back_populates="reader")
 
+    # Prefix search over the folded name and email. On PostgreSQL the pattern
+    # ops let LIKE 'prefix%' use them whatever the database collation is.
+    __table_args__ = (
+        Index('ix_readers_name_folded', 'name_folded', 'id', postgresql_ops={'name_folded': 'text_pattern_ops'}),
+        Index('ix_readers_email_folded', 'email_folded', 'id', postgresql_ops={'email_folded': 'text_pattern_ops'}),
+    )
+
 
 class BorrowedBook(Base):
     __tablename__ = "borrowed_books"
@@ -42,12 +112,88 @@ class BorrowedBook(Base):
     book_id = Column(Integer, ForeignKey("books.id"), nullable=False, index = True)
     reader_id = Column(Integer, ForeignKey("readers.id"), nullable=False, index = True)
     borrow_date = Column(DateTime(timezone=True), server_default=func.now())
+    due_date = Column(DateTime(timezone=True), nullable=True)
     return_date = Column(DateTime(timezone=True), nullable=True)
 
     book = relationship("Book", back_populates="borrows")
     reader = relationship("Reader", back_populates="borrows")
 
     # Enforce "return_date" uq so that the same reader can borrow the same book multiple times
+    # Partial indexes cover only active borrows, so lookups stay small as history grows
     __table_args__ = (
         UniqueConstraint('book_id', 'reader_id', 'return_date', name='uq_borrow_unique_active'),
-    )
\ No newline at end of file
+        Index('ix_borrowed_books_active_reader_id', 'reader_id',
+              postgresql_where=return_date.is_(None), sqlite_where=return_date.is_(None)),
+        Index('ix_borrowed_books_active_book_id', 'book_id',
+              postgresql_where=return_date.is_(None), sqlite_where=return_date.is_(None)),
+        # Drives GET /overdue and the overdue scanner in (due_date, id) order
+        Index('ix_borrowed_books_active_due_date', 'due_date', 'id',
+              postgresql_where=return_date.is_(None), sqlite_where=return_date.is_(None)),
+    )
+
+# Returned borrows are moved here in batches by the archive job, which keeps
+# borrowed_books small. On PostgreSQL the table is range partitioned by month
+# of borrow_date; the partition key has to be part of the primary key there.
+class BorrowedBookHistory(Base):
+    __tablename__ = "borrowed_books_history"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    borrow_date = Column(DateTime(timezone=True), primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    reader_id = Column(Integer, ForeignKey("readers.id"), nullable=False)
+    due_date = Column(DateTime(timezone=True), nullable=True)
+    return_date = Column(DateTime(timezone=True), nullable=False)
+
+    # Serve the keyset-paginated history endpoints, newest first
+    __table_args__ = (
+        Index('ix_borrowed_books_history_reader', 'reader_id', 'borrow_date', 'id'),
+        Index('ix_borrowed_books_history_book', 'book_id', 'borrow_date', 'id'),
+        {"postgresql_partition_by": "RANGE (borrow_date)"},
+    )
+
+
+# Persisted progress of incremental background jobs: the (date, id) position
+# of the last row a job has processed
+class JobWatermark(Base):
+    __tablename__ = "job_watermarks"
+
+    name = Column(String, primary_key=True)
+    position_date = Column(DateTime(timezone=True), nullable=True)
+    position_id = Column(Integer, nullable=True)
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+
+
+# Borrowing analytics, kept up to date by the borrow and return routes in the
+# same transaction and rebuilt from scratch by `python -m app.cli rebuild-stats`
+class BookBorrowStats(Base):
+    __tablename__ = "book_borrow_stats"
+
+    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    borrow_count = Column(Integer, nullable=False, default=0)
+
+    # Most borrowed books are read off the end of this index
+    __table_args__ = (
+        Index('ix_book_borrow_stats_count', 'borrow_count', 'book_id'),
+    )
+
+
+class ReaderBorrowStats(Base):
+    __tablename__ = "reader_borrow_stats"
+
+    reader_id = Column(Integer, ForeignKey("readers.id"), primary_key=True)
+    borrow_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_reader_borrow_stats_count', 'borrow_count', 'reader_id'),
+    )
+
+
+# Every borrow and return of a day would otherwise update the same row, so a
+# day is split over a few shard rows that are summed when read
+class DailyBorrowStats(Base):
+    __tablename__ = "daily_borrow_stats"
+
+    day = Column(Date, primary_key=True)
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    borrows = Column(Integer, nullable=False, default=0)
+    returns = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+
+from app.core.pool import pool_stats
+from app.core.response_cache import catalogue_cache
+from app.dependencies.dependencies import get_current_user, user_cache
+from app.core.query_budget import query_budget
+
+router = APIRouter()
+
+@router.get("/cache")
+@query_budget(1)
+async def cache_stats(user=Depends(get_current_user)):
+    return {"catalogue": catalogue_cache.stats(), "users": user_cache.stats()}
+
+# Pool usage of the primary and replica engines, with checkout wait times
+@router.get("/pool")
+@query_budget(1)
+async def connection_pool_stats(user=Depends(get_current_user)):
+    return pool_stats()
@@ -1,50 +1,413 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional
+import csv
+import io
+import json
+import math
+import re
 
-from app.database import get_db
-from app.models.models import Book
-from app.schemas.schemas import BookCreate, BookRead
+from app.database import get_async_db, get_read_db
+from app.models.models import Book, utcnow
+from app.schemas.schemas import BookCreate, BookRead, BookPage, BulkImportResult
 from app.dependencies.dependencies import get_current_user
+from app.core.pagination import encode_cursor, decode_cursor, keyset_after
+from app.core.etags import book_etag, parse_book_etag, collection_etag, etag_matches
+from app.core.response_cache import catalogue_cache
+from app.core.config import settings
+from app.core.serialization import (
+    MAX_MULTI_GET_IDS, dumps, json_response, model_columns, order_by_ids, parse_fields, parse_ids, rows_to_dicts,
+)
+from app.core.query_budget import query_budget
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 200
+# Query parameters that have no meaning for GET /books?ids=
+MULTI_GET_CONFLICTS = {"limit", "cursor", "sort", "order", "author", "year_from", "year_to", "isbn"}
+
+# Descriptions can be kilobytes of text, so lists leave them out unless asked
+# for with ?fields=...,description
+LIST_FIELDS = tuple(name for name in BookRead.model_fields if name != "description")
+
+# Sort keys must be non-nullable so that the (key, id) keyset is a total order
+SORT_COLUMNS = {"id": Book.id, "title": Book.title, "author": Book.author}
+# Python type of each sort key, which a cursor's value must have
+SORT_TYPES = {"id": int, "title": str, "author": str}
+
+EXPORT_COLUMNS = ("id", "title", "author", "publication_year", "isbn", "copies", "description")
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+BULK_IMPORT_MAX_ITEMS = 10000
+BULK_IMPORT_BATCH_SIZE = 500
+# Two statements per keyed batch, plus unkeyed inserts and the user lookup
+BULK_IMPORT_QUERY_BUDGET = 2 * math.ceil(BULK_IMPORT_MAX_ITEMS / BULK_IMPORT_BATCH_SIZE) + 2
+UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Search results are relevance-ordered, so pages are addressed by offset; the
+# cap keeps the cost of deep pages bounded
+MAX_SEARCH_RESULTS = 1000
+BOOK_COLUMNS = "books.id, books.title, books.author, books.publication_year, books.isbn, books.copies, books.description"
+SEARCH_STATEMENTS = {
+    "sqlite": text(
+        f"SELECT {BOOK_COLUMNS} FROM books_fts JOIN books ON books.id = books_fts.rowid "
+        "WHERE books_fts MATCH :query "
+        "ORDER BY bm25(books_fts, 10.0, 5.0, 1.0), books.id LIMIT :limit OFFSET :offset"
+    ),
+    "postgresql": text(
+        f"SELECT {BOOK_COLUMNS} FROM books, to_tsquery('simple', :query) AS query "
+        "WHERE books.search_vector @@ query "
+        "ORDER BY ts_rank_cd(books.search_vector, query) DESC, books.id LIMIT :limit OFFSET :offset"
+    ),
+}
+
+# Free text is reduced to word tokens, each matched as a prefix, so user input
+# can never break the FTS query syntax
+def _search_query(dialect_name: str, q: str) -> Optional[str]:
+    terms = re.findall(r"\w+", q.lower())
+    if not terms:
+        return None
+    if dialect_name == "postgresql":
+        return " & ".join(f"{term}:*" for term in terms)
+    return " ".join(f'"{term}"*' for term in terms)
+
 @router.post("", response_model=BookRead, status_code=status.HTTP_201_CREATED)
-def create_book(book: BookCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
+@query_budget(3)
+async def create_book(book: BookCreate, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
     db_book = Book(**book.model_dump())
     db.add(db_book)
-    db.commit()
-    db.refresh(db_book)
+    await db.commit()
+    catalogue_cache.invalidate()
+    await db.refresh(db_book)
     return db_book
 
-@router.get("", response_model=List[BookRead])
-def list_books(db: Session = Depends(get_db)):
-    return db.query(Book).all()
+# Accepts either a JSON array or NDJSON (one object per line) request body
+async def read_bulk_items(request: Request) -> list:
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed request body")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a list of books")
+    if len(items) > BULK_IMPORT_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_IMPORT_MAX_ITEMS} books per request")
+    return items
+
+@router.post("/bulk", response_model=BulkImportResult)
+@query_budget(BULK_IMPORT_QUERY_BUDGET)
+async def bulk_import_books(items: list = Depends(read_bulk_items), db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
+    insert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        raise HTTPException(status_code=501, detail="Bulk import is not supported on this database")
+
+    # Rows with an ISBN are upserted in multi-row statements and matched back by
+    # ISBN; rows without one cannot conflict and are plainly inserted
+    results = [None] * len(items)
+    keyed, unkeyed, seen_isbns = [], [], set()
+    for index, item in enumerate(items):
+        try:
+            book = BookCreate.model_validate(item)
+        except ValidationError as exc:
+            results[index] = {"index": index, "status": "error", "error": str(exc.errors()[0]["msg"])}
+            continue
+        if book.isbn is not None:
+            if book.isbn in seen_isbns:
+                results[index] = {"index": index, "status": "error", "error": "Duplicate ISBN in request"}
+                continue
+            seen_isbns.add(book.isbn)
+            keyed.append((index, book.model_dump()))
+        else:
+            unkeyed.append((index, Book(**book.model_dump())))
+
+    statement = insert(Book)
+    statement = statement.on_conflict_do_update(
+        index_elements=[Book.isbn],
+        set_={
+            **{name: statement.excluded[name] for name in BookCreate.model_fields},
+            "version": Book.version + 1,
+            "updated_at": utcnow(),
+        },
+    )
+    for start in range(0, len(keyed), BULK_IMPORT_BATCH_SIZE):
+        batch = keyed[start:start + BULK_IMPORT_BATCH_SIZE]
+        batch_isbns = [row["isbn"] for _, row in batch]
+        existing = set(await db.scalars(select(Book.isbn).where(Book.isbn.in_(batch_isbns))))
+        ids = dict((await db.execute(
+            statement.values([row for _, row in batch]).returning(Book.isbn, Book.id)
+        )).all())
+        for index, row in batch:
+            status_ = "updated" if row["isbn"] in existing else "created"
+            results[index] = {"index": index, "status": status_, "id": ids[row["isbn"]]}
+
+    if unkeyed:
+        db.add_all(book for _, book in unkeyed)
+        await db.flush()
+        for index, book in unkeyed:
+            results[index] = {"index": index, "status": "created", "id": book.id}
+    await db.commit()
+    if keyed or unkeyed:
+        catalogue_cache.invalidate()
+
+    counts = {"created": 0, "updated": 0, "error": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return {"created": counts["created"], "updated": counts["updated"], "failed": counts["error"], "results": results}
+
+# GET /books?ids=...: the books in the order asked for, in one IN query. These
+# lookups bypass the catalogue cache, whose keys they would only churn.
+async def _books_by_ids(db: AsyncSession, ids: list, names: tuple, if_none_match: Optional[str]):
+    rows = (await db.execute(
+        select(*model_columns(Book, BookRead, names), Book.version).where(Book.id.in_(ids))
+    )).all()
+    rows = order_by_ids(rows, ids)
+    etag = collection_etag([(row.id, row.version) for row in rows], "ids", names)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return json_response({"items": rows_to_dicts(BookRead, rows, names), "next_cursor": None}, headers={"ETag": etag})
+
+@router.get("", response_model=BookPage)
+@query_budget(2)
+async def list_books(
+    request: Request,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Literal["id", "title", "author"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    author: Optional[str] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    isbn: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma separated fields to return; description is left out by default"),
+    ids: Optional[str] = Query(None, description=f"Comma separated ids to fetch, up to {MAX_MULTI_GET_IDS}"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    names = parse_fields(BookRead, fields, LIST_FIELDS)
+    if ids is not None:
+        # Filters, sorting and paging do not apply to a multi-get, so asking for
+        # them with ids= is an error rather than silently ignored
+        conflicting = sorted(MULTI_GET_CONFLICTS.intersection(request.query_params.keys()))
+        if conflicting:
+            raise HTTPException(status_code=400, detail=f"ids cannot be combined with {', '.join(conflicting)}")
+        return await _books_by_ids(db, parse_ids(ids), names, if_none_match)
+    # Pages are served from the read-through cache as ready-made JSON bytes;
+    # any write to books or borrows invalidates the whole catalogue
+    key = (sort, order, limit, cursor, author, year_from, year_to, isbn, names)
+    cached = catalogue_cache.get(key)
+    if cached is not None:
+        body, etag = cached
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+    generation = catalogue_cache.generation()
+
+    sort_column = SORT_COLUMNS[sort]
+    descending = order == "desc"
+
+    query = select()
+    if author is not None:
+        query = query.where(Book.author == author)
+    if year_from is not None:
+        query = query.where(Book.publication_year >= year_from)
+    if year_to is not None:
+        query = query.where(Book.publication_year <= year_to)
+    if isbn is not None:
+        query = query.where(Book.isbn == isbn)
+
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("sort") != sort or position.get("order") != order:
+            raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+        # Cursors come from the client, so a value of the wrong type must not
+        # reach the database
+        if not all(
+            isinstance(value, expected) and not isinstance(value, bool)
+            for value, expected in ((position.get("id"), int), (position.get("value"), SORT_TYPES[sort]))
+        ):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(keyset_after(sort_column, Book.id, position.get("value"), position["id"], descending))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), Book.id.desc())
+    else:
+        query = query.order_by(sort_column, Book.id)
+
+    # Fetch one extra row to know whether another page exists
+    query = query.limit(limit + 1)
+
+    # Revalidation only needs the (id, version) keys of the page, not the rows
+    if if_none_match:
+        keys = (await db.execute(query.add_columns(Book.id, Book.version))).all()
+        etag = collection_etag(keys, sort, order, names)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    # Only the requested columns are read, as plain tuples instead of ORM
+    # objects; the version and, if it was not requested, the sort key follow them
+    extra = [Book.version] if sort in names else [Book.version, sort_column]
+    rows = (await db.execute(query.add_columns(*model_columns(Book, BookRead, names), *extra))).all()
+    etag = collection_etag([(row.id, row.version) for row in rows], sort, order, names)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor({
+            "sort": sort,
+            "order": order,
+            "value": getattr(last, sort),
+            "id": last.id,
+        })
+    body = dumps({"items": rows_to_dicts(BookRead, rows, names), "next_cursor": next_cursor})
+    # A replica may not have the latest write yet, and its page would outlive the lag in the cache
+    if not db.info.get("replica") or catalogue_cache.settled(settings.REPLICA_MAX_LAG_SECONDS):
+        catalogue_cache.set(key, generation, body, etag)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+@router.get("/search", response_model=BookPage)
+@query_budget(1)
+async def search_books(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name not in SEARCH_STATEMENTS:
+        raise HTTPException(status_code=501, detail="Search is not supported on this database")
+
+    offset = 0
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("q") != q or not isinstance(position.get("offset"), int):
+            raise HTTPException(status_code=400, detail="Cursor does not match search")
+        offset = position["offset"]
+    limit = min(limit, MAX_SEARCH_RESULTS - offset)
+
+    query = _search_query(dialect_name, q)
+    if query is None or limit <= 0:
+        return {"items": [], "next_cursor": None}
+
+    books = (await db.scalars(
+        select(Book).from_statement(SEARCH_STATEMENTS[dialect_name]),
+        {"query": query, "limit": limit + 1, "offset": offset},
+    )).all()
+    next_cursor = None
+    if len(books) > limit:
+        books = books[:limit]
+        if offset + limit < MAX_SEARCH_RESULTS:
+            next_cursor = encode_cursor({"q": q, "offset": offset + limit})
+    return {"items": books, "next_cursor": next_cursor}
+
+# Streams plain column tuples from a server-side cursor on its own connection,
+# so memory stays bounded by one batch regardless of catalogue size
+async def _export_rows(bind, format: str):
+    statement = select(*(getattr(Book, name) for name in EXPORT_COLUMNS)).order_by(Book.id)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+
+    async with bind.connect() as connection:
+        result = await connection.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            if format == "csv":
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row))))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+
+@router.get("/export")
+@query_budget(2)
+async def export_books(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    return StreamingResponse(
+        _export_rows(db.bind, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="books.{format}"'},
+    )
 
 @router.get("/{book_id}", response_model=BookRead)
-def get_book(book_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    book = db.query(Book).filter(Book.id == book_id).first()
-    if not book:
+@query_budget(3)
+async def get_book(
+    book_id: int,
+    fields: Optional[str] = Query(None, description="Comma separated fields to return"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
+    user=Depends(get_current_user),
+):
+    names = parse_fields(BookRead, fields)
+    sparse = names if names != tuple(BookRead.model_fields) else ()
+    if if_none_match:
+        version = await db.scalar(select(Book.version).where(Book.id == book_id))
+        if version is None:
+            raise HTTPException(status_code=404, detail="Book not found")
+        etag = book_etag(book_id, version, sparse)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    row = (await db.execute(
+        select(*model_columns(Book, BookRead, names), Book.version).where(Book.id == book_id)
+    )).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+    return json_response(rows_to_dicts(BookRead, [row], names)[0], headers={"ETag": book_etag(book_id, row.version, sparse)})
 
 @router.put("/{book_id}", response_model=BookRead)
-def update_book(book_id: int, book_update: BookCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    book = db.query(Book).filter(Book.id == book_id).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
+@query_budget(3)
+async def update_book(
+    book_id: int,
+    book_update: BookCreate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    # If-Match turns the update into a compare-and-set on the row version
+    conditions = [Book.id == book_id]
+    if if_match and if_match.strip() != "*":
+        expected = parse_book_etag(if_match)
+        if expected is None or expected[0] != book_id:
+            raise HTTPException(status_code=412, detail="Book has been modified")
+        conditions.append(Book.version == expected[1])
 
-    for key, value in book_update.model_dump().items():
-        setattr(book, key, value)
-    db.commit()
-    db.refresh(book)
+    book = await db.scalar(
+        update(Book).where(*conditions).values(**book_update.model_dump()).returning(Book)
+    )
+    if book is None:
+        await db.rollback()
+        if await db.scalar(select(Book.id).where(Book.id == book_id)) is None:
+            raise HTTPException(status_code=404, detail="Book not found")
+        raise HTTPException(status_code=412, detail="Book has been modified")
+    await db.commit()
+    catalogue_cache.invalidate()
+    response.headers["ETag"] = book_etag(book.id, book.version)
     return book
 
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_book(book_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    book = db.query(Book).filter(Book.id == book_id).first()
+@query_budget(4)
+async def delete_book(book_id: int, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
+    book = await db.scalar(select(Book).where(Book.id == book_id))
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    db.delete(book)
-    db.commit()
+    await db.delete(book)
+    await db.commit()
+    catalogue_cache.invalidate()
     return
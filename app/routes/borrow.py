@@ -1,84 +1,446 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import datetime
-from typing import List
-
-from app.database import get_db
-from app.models.models import Book, Reader, BorrowedBook
-from app.schemas.schemas import BorrowRequest, ReturnRequest, BorrowedBookRead, ReaderCreate
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from sqlalchemy import select, insert, update, case, func, and_, or_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Annotated, List, Literal, Optional
+
+from app.database import get_async_db, get_read_db
+from app.models.models import Book, Reader, BorrowedBook, BorrowedBookHistory
+from app.schemas.schemas import (
+    BorrowRequest, ReturnRequest, BorrowedBookRead, BorrowedBookExpanded, BookSummary, ReaderCreate, ReaderDetail, ReaderPage, BatchItemResult, BorrowHistoryRead, BorrowHistoryPage,
+    OverduePage,
+)
 from app.dependencies.dependencies import get_current_user
+from app.core.config import settings
+from app.core.analytics import record_borrows, record_returns
+from app.core.response_cache import catalogue_cache
+from app.core.serialization import MAX_MULTI_GET_IDS, json_response, model_columns, order_by_ids, parse_ids, rows_to_dicts
+from app.core.pagination import encode_cursor, decode_cursor, keyset_after
+from app.core.query_budget import query_budget
 
 router = APIRouter()
 
+MAX_ACTIVE_BORROWS = 3
+MAX_BATCH_SIZE = 100
+MAX_HISTORY_PAGE_SIZE = 200
+MAX_OVERDUE_PAGE_SIZE = 200
+MAX_READER_PAGE_SIZE = 200
+# Query parameters that have no meaning for GET /readers?ids=
+READER_MULTI_GET_CONFLICTS = {"q", "limit", "cursor"}
+
 @router.post("/borrow", response_model=BorrowedBookRead)
-def borrow_book(request: BorrowRequest, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    book = db.query(Book).filter(Book.id == request.book_id).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-    if book.copies <= 0:
+@query_budget(7)
+async def borrow_book(request: BorrowRequest, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
+    # Claim a copy with a guarded UPDATE first: it is atomic, so concurrent
+    # borrows can never take the same last copy or drive copies negative
+    book_id = await db.scalar(
+        update(Book)
+        .where(Book.id == request.book_id, Book.copies > 0)
+        .values(copies=Book.copies - 1)
+        .returning(Book.id)
+    )
+    if book_id is None:
+        await db.rollback()
+        if await db.scalar(select(Book.id).where(Book.id == request.book_id)) is None:
+            raise HTTPException(status_code=404, detail="Book not found")
         raise HTTPException(status_code=400, detail="No copies available")
 
-    reader = db.query(Reader).filter(Reader.id == request.reader_id).first()
-    if not reader:
-        raise HTTPException(status_code=404, detail="Reader not found")
+    # The borrow limit is checked and reserved against the reader's active borrow
+    # counter in the same guarded way
+    reader_id = await db.scalar(
+        update(Reader)
+        .where(Reader.id == request.reader_id, Reader.active_borrow_count < MAX_ACTIVE_BORROWS)
+        .values(active_borrow_count=Reader.active_borrow_count + 1)
+        .returning(Reader.id)
+    )
+    if reader_id is None:
+        await db.rollback()
+        if await db.scalar(select(Reader.id).where(Reader.id == request.reader_id)) is None:
+            raise HTTPException(status_code=404, detail="Reader not found")
+        raise HTTPException(status_code=400, detail=f"Reader has already borrowed {MAX_ACTIVE_BORROWS} books")
 
-    active_borrows = db.query(BorrowedBook).filter(
-        BorrowedBook.reader_id == reader.id,
-        BorrowedBook.return_date == None
-    ).count()
-    if active_borrows >= 3:
-        raise HTTPException(status_code=400, detail="Reader has already borrowed 3 books")
-
-    borrowed = BorrowedBook(
-        book_id=book.id,
-        reader_id=reader.id,
-        borrow_date=datetime.now()
+    now = datetime.now()
+    borrowed = await db.scalar(
+        insert(BorrowedBook)
+        .values(book_id=book_id, reader_id=reader_id, borrow_date=now, due_date=now + timedelta(days=settings.LOAN_PERIOD_DAYS))
+        .returning(BorrowedBook)
     )
-    book.copies -= 1
-    db.add(borrowed)
-    db.commit()
-    db.refresh(borrowed)
+    await record_borrows(db, [(book_id, reader_id, now)])
+    await db.commit()
+    # Copies changed, so cached catalogue pages are stale
+    catalogue_cache.invalidate()
     return borrowed
 
-@router.get("/borrow/{reader_id}", response_model=List[BorrowedBookRead])
-def get_active_borrows_by_reader(reader_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    borrows = db.query(BorrowedBook).filter(
+@router.get("/borrow/{reader_id}", response_model=List[BorrowedBookExpanded])
+@query_budget(2)
+async def get_active_borrows_by_reader(
+    reader_id: int,
+    expand: Optional[Literal["book"]] = Query(None, description="book: embed each borrowed book"),
+    db: AsyncSession = Depends(get_read_db),
+    user=Depends(get_current_user),
+):
+    query = select(*model_columns(BorrowedBook, BorrowedBookRead)).where(
         BorrowedBook.reader_id == reader_id,
         BorrowedBook.return_date == None
-    ).all()
-    return borrows
+    )
+    if expand != "book":
+        return json_response(rows_to_dicts(BorrowedBookRead, (await db.execute(query)).all()))
+
+    # The books come from the same query, so the client needs no request per borrow
+    book_fields = tuple(BookSummary.model_fields)
+    query = query.join(Book, Book.id == BorrowedBook.book_id).add_columns(
+        *(column.label(f"book_{name}") for name, column in zip(book_fields, model_columns(Book, BookSummary)))
+    )
+    borrow_fields = tuple(BorrowedBookRead.model_fields)
+    return json_response([
+        {**dict(zip(borrow_fields, row)), "book": dict(zip(book_fields, row[len(borrow_fields):]))}
+        for row in (await db.execute(query)).all()
+    ])
 
 
 @router.post("/return", response_model=BorrowedBookRead)
-def return_book(request: ReturnRequest, db: Session = Depends(get_db), user=Depends(get_current_user)):
+@query_budget(5)
+async def return_book(request: ReturnRequest, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
     if request.borrow_id:
-        borrow = db.query(BorrowedBook).filter(BorrowedBook.id == request.borrow_id).first()
+        target = BorrowedBook.id == request.borrow_id
     elif request.book_id and request.reader_id:
-        borrow = db.query(BorrowedBook).filter(
+        target = BorrowedBook.id == select(BorrowedBook.id).where(
             BorrowedBook.book_id == request.book_id,
             BorrowedBook.reader_id == request.reader_id,
             BorrowedBook.return_date == None
-        ).first()
+        ).limit(1).scalar_subquery()
     else:
         raise HTTPException(status_code=400, detail="Invalid return request")
 
-    if not borrow or borrow.return_date is not None:
+    # Closing the borrow is guarded on return_date, so a record is returned at most once
+    now = datetime.now()
+    borrow = await db.scalar(
+        update(BorrowedBook)
+        .where(target, BorrowedBook.return_date == None)
+        .values(return_date=now)
+        .returning(BorrowedBook)
+    )
+    if borrow is None:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Borrow record not found or already returned")
 
-    borrow.return_date = datetime.now()
-    book = db.query(Book).filter(Book.id == borrow.book_id).first()
-    if book:
-        book.copies += 1
-    db.commit()
-    db.refresh(borrow)
+    await db.execute(update(Book).where(Book.id == borrow.book_id).values(copies=Book.copies + 1))
+    await db.execute(
+        update(Reader)
+        .where(Reader.id == borrow.reader_id)
+        .values(active_borrow_count=Reader.active_borrow_count - 1)
+    )
+    await record_returns(db, [(borrow.reader_id, now)])
+    await db.commit()
+    catalogue_cache.invalidate()
     return borrow
 
+# Batch endpoints validate a whole cart with set-based queries against locked
+# rows and apply it with one statement per table, so the number of round trips
+# does not depend on the cart size. Counter updates stay guarded; if a
+# concurrent writer got in first, the batch is rolled back with 409.
+
+@router.post("/borrow/batch", response_model=List[BatchItemResult])
+@query_budget(9)
+async def borrow_books_batch(
+    requests: Annotated[List[BorrowRequest], Body(min_length=1, max_length=MAX_BATCH_SIZE)],
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    copies = dict((await db.execute(
+        select(Book.id, Book.copies).where(Book.id.in_({r.book_id for r in requests})).with_for_update()
+    )).all())
+    active = dict((await db.execute(
+        select(Reader.id, Reader.active_borrow_count).where(Reader.id.in_({r.reader_id for r in requests})).with_for_update()
+    )).all())
+
+    results, accepted = [], []
+    taken, added = Counter(), Counter()
+    for index, request in enumerate(requests):
+        if request.book_id not in copies:
+            error = "Book not found"
+        elif copies[request.book_id] - taken[request.book_id] <= 0:
+            error = "No copies available"
+        elif request.reader_id not in active:
+            error = "Reader not found"
+        elif active[request.reader_id] + added[request.reader_id] >= MAX_ACTIVE_BORROWS:
+            error = f"Reader has already borrowed {MAX_ACTIVE_BORROWS} books"
+        else:
+            taken[request.book_id] += 1
+            added[request.reader_id] += 1
+            accepted.append(index)
+            results.append({"index": index, "success": True})
+            continue
+        results.append({"index": index, "success": False, "error": error})
+
+    if not accepted:
+        await db.rollback()
+        return results
+
+    taken_by_book = case(taken, value=Book.id)
+    books_updated = await db.execute(
+        update(Book)
+        .where(Book.id.in_(taken), Book.copies >= taken_by_book)
+        .values(copies=Book.copies - taken_by_book)
+        .execution_options(synchronize_session=False)
+    )
+    added_by_reader = case(added, value=Reader.id)
+    readers_updated = await db.execute(
+        update(Reader)
+        .where(Reader.id.in_(added), Reader.active_borrow_count + added_by_reader <= MAX_ACTIVE_BORROWS)
+        .values(active_borrow_count=Reader.active_borrow_count + added_by_reader)
+        .execution_options(synchronize_session=False)
+    )
+    if books_updated.rowcount != len(taken) or readers_updated.rowcount != len(added):
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Books or readers changed concurrently, retry the batch")
+
+    now = datetime.now()
+    due_date = now + timedelta(days=settings.LOAN_PERIOD_DAYS)
+    borrows = (await db.scalars(
+        insert(BorrowedBook)
+        .values([
+            {"book_id": requests[i].book_id, "reader_id": requests[i].reader_id, "borrow_date": now, "due_date": due_date}
+            for i in accepted
+        ])
+        .returning(BorrowedBook)
+    )).all()
+    await record_borrows(db, [(borrow.book_id, borrow.reader_id, now) for borrow in borrows])
+    await db.commit()
+    catalogue_cache.invalidate()
+
+    # Rows for the same book and reader are interchangeable, so match them back by pair
+    by_pair = defaultdict(list)
+    for borrow in borrows:
+        by_pair[(borrow.book_id, borrow.reader_id)].append(borrow)
+    for i in accepted:
+        results[i]["borrow"] = by_pair[(requests[i].book_id, requests[i].reader_id)].pop()
+    return results
+
+@router.post("/return/batch", response_model=List[BatchItemResult])
+@query_budget(6)
+async def return_books_batch(
+    requests: Annotated[List[ReturnRequest], Body(min_length=1, max_length=MAX_BATCH_SIZE)],
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    borrow_ids = {r.borrow_id for r in requests if r.borrow_id}
+    pairs = {(r.book_id, r.reader_id) for r in requests if not r.borrow_id and r.book_id and r.reader_id}
+    conditions = []
+    if borrow_ids:
+        conditions.append(BorrowedBook.id.in_(borrow_ids))
+    if pairs:
+        conditions.append(tuple_(BorrowedBook.book_id, BorrowedBook.reader_id).in_(pairs))
+
+    open_borrows = []
+    if conditions:
+        open_borrows = (await db.execute(
+            select(BorrowedBook.id, BorrowedBook.book_id, BorrowedBook.reader_id)
+            .where(BorrowedBook.return_date == None, or_(*conditions))
+            .order_by(BorrowedBook.id)
+            .with_for_update()
+        )).all()
+    by_id = {row.id: row for row in open_borrows}
+    by_pair = defaultdict(list)
+    for row in open_borrows:
+        by_pair[(row.book_id, row.reader_id)].append(row)
+
+    results, claimed = [], {}
+    for index, request in enumerate(requests):
+        if request.borrow_id:
+            row = by_id.get(request.borrow_id)
+        elif request.book_id and request.reader_id:
+            row = next((r for r in by_pair[(request.book_id, request.reader_id)] if r.id not in claimed), None)
+        else:
+            results.append({"index": index, "success": False, "error": "Invalid return request"})
+            continue
+        if row is None or row.id in claimed:
+            results.append({"index": index, "success": False, "error": "Borrow record not found or already returned"})
+            continue
+        claimed[row.id] = index
+        results.append({"index": index, "success": True})
+
+    if not claimed:
+        await db.rollback()
+        return results
+
+    now = datetime.now()
+    returned = (await db.scalars(
+        update(BorrowedBook)
+        .where(BorrowedBook.id.in_(claimed), BorrowedBook.return_date == None)
+        .values(return_date=now)
+        .returning(BorrowedBook)
+    )).all()
+    if len(returned) != len(claimed):
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Borrows changed concurrently, retry the batch")
+
+    given_back = case(Counter(b.book_id for b in returned), value=Book.id)
+    await db.execute(
+        update(Book)
+        .where(Book.id.in_({b.book_id for b in returned}))
+        .values(copies=Book.copies + given_back)
+        .execution_options(synchronize_session=False)
+    )
+    closed = case(Counter(b.reader_id for b in returned), value=Reader.id)
+    await db.execute(
+        update(Reader)
+        .where(Reader.id.in_({b.reader_id for b in returned}))
+        .values(active_borrow_count=Reader.active_borrow_count - closed)
+        .execution_options(synchronize_session=False)
+    )
+    await record_returns(db, [(borrow.reader_id, now) for borrow in returned])
+    await db.commit()
+    catalogue_cache.invalidate()
+
+    for borrow in returned:
+        results[claimed[borrow.id]]["borrow"] = borrow
+    return results
+
+# One page of rows ordered by (date_column, id) with a keyset cursor over that pair
+async def _keyset_page(db: AsyncSession, query, schema, date_column, id_column, limit: int, cursor: Optional[str],
+                       descending: bool = False):
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            after = datetime.fromisoformat(position["date"]), int(position["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(keyset_after(date_column, id_column, *after, descending=descending))
+    order = (date_column.desc(), id_column.desc()) if descending else (date_column, id_column)
+    rows = (await db.execute(query.order_by(*order).limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor({"date": getattr(last, date_column.key).isoformat(), "id": last.id})
+    return json_response({"items": rows_to_dicts(schema, rows), "next_cursor": next_cursor})
+
+# Archived borrows, newest first
+async def _history_page(db: AsyncSession, condition, limit: int, cursor: Optional[str]):
+    query = select(*model_columns(BorrowedBookHistory, BorrowHistoryRead)).where(condition)
+    return await _keyset_page(
+        db, query, BorrowHistoryRead, BorrowedBookHistory.borrow_date, BorrowedBookHistory.id, limit, cursor,
+        descending=True,
+    )
+
+@router.get("/readers/{reader_id}/history", response_model=BorrowHistoryPage)
+@query_budget(2)
+async def get_reader_history(
+    reader_id: int,
+    limit: int = Query(50, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    return await _history_page(db, BorrowedBookHistory.reader_id == reader_id, limit, cursor)
+
+@router.get("/books/{book_id}/history", response_model=BorrowHistoryPage)
+@query_budget(2)
+async def get_book_history(
+    book_id: int,
+    limit: int = Query(50, ge=1, le=MAX_HISTORY_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    return await _history_page(db, BorrowedBookHistory.book_id == book_id, limit, cursor)
+
+# Active borrows past their due date, longest overdue first
+@router.get("/overdue", response_model=OverduePage)
+@query_budget(2)
+async def get_overdue_borrows(
+    limit: int = Query(50, ge=1, le=MAX_OVERDUE_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    query = select(*model_columns(BorrowedBook, BorrowedBookRead)).where(
+        BorrowedBook.return_date == None,
+        BorrowedBook.due_date < datetime.now(),
+    )
+    return await _keyset_page(db, query, BorrowedBookRead, BorrowedBook.due_date, BorrowedBook.id, limit, cursor)
+
+# Matches values starting with prefix (both already case-folded) through the
+# folded-column indexes on readers: LIKE on the pattern-ops index on
+# PostgreSQL, a range on SQLite, whose case-insensitive LIKE cannot use them
+def _prefix_match(dialect_name: str, expression, prefix: str):
+    if dialect_name == "postgresql":
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return expression.like(escaped + "%", escape="\\")
+    upper = _prefix_upper_bound(prefix)
+    return expression >= prefix if upper is None else and_(expression >= prefix, expression < upper)
+
+# The smallest string above every string that starts with prefix, or None when
+# there is none (prefix is all U+10FFFF). Surrogates are skipped, they cannot
+# be encoded to the UTF-8 SQLite compares.
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    stem = prefix.rstrip(chr(0x10FFFF))
+    if not stem:
+        return None
+    code = ord(stem[-1]) + 1
+    return stem[:-1] + chr(0xE000 if 0xD800 <= code <= 0xDFFF else code)
+
+# The reader directory in id order with a keyset cursor. q narrows it to
+# readers whose name or email starts with q; ids= is a multi-get that returns
+# the readers in the order asked for.
+@router.get("/readers", response_model=ReaderPage)
+@query_budget(2)
+async def list_readers(
+    request: Request,
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Prefix of the name or email"),
+    limit: int = Query(50, ge=1, le=MAX_READER_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    ids: Optional[str] = Query(None, description=f"Comma separated ids to fetch, up to {MAX_MULTI_GET_IDS}"),
+    db: AsyncSession = Depends(get_read_db),
+    user=Depends(get_current_user),
+):
+    # The active borrow count is a column kept up to date by borrow and
+    # return, so the listing needs no join or GROUP BY over borrowed_books
+    query = select(*model_columns(Reader, ReaderDetail))
+    if ids is not None:
+        conflicting = sorted(READER_MULTI_GET_CONFLICTS.intersection(request.query_params.keys()))
+        if conflicting:
+            raise HTTPException(status_code=400, detail=f"ids cannot be combined with {', '.join(conflicting)}")
+        requested = parse_ids(ids)
+        rows = (await db.execute(query.where(Reader.id.in_(requested)))).all()
+        return json_response({"items": rows_to_dicts(ReaderDetail, order_by_ids(rows, requested)), "next_cursor": None})
+
+    if q is not None:
+        prefix, dialect_name = q.casefold(), db.get_bind().dialect.name
+        query = query.where(or_(
+            _prefix_match(dialect_name, Reader.name_folded, prefix),
+            _prefix_match(dialect_name, Reader.email_folded, prefix),
+        ))
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get("q") != q or not isinstance(position.get("id"), int):
+            raise HTTPException(status_code=400, detail="Cursor does not match search")
+        query = query.where(Reader.id > position["id"])
+
+    rows = (await db.execute(query.order_by(Reader.id).limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({"q": q, "id": rows[-1].id})
+    return json_response({"items": rows_to_dicts(ReaderDetail, rows), "next_cursor": next_cursor})
+
+@router.get("/readers/{reader_id}", response_model=ReaderDetail)
+@query_budget(2)
+async def get_reader(reader_id: int, db: AsyncSession = Depends(get_read_db), user=Depends(get_current_user)):
+    row = (await db.execute(select(*model_columns(Reader, ReaderDetail)).where(Reader.id == reader_id))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Reader not found")
+    return json_response(rows_to_dicts(ReaderDetail, [row])[0])
+
 @router.post("/readers")
-def create_reader(reader: ReaderCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    if db.query(Reader).filter(Reader.email == reader.email).first():
+@query_budget(4)
+async def create_reader(reader: ReaderCreate, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
+    if await db.scalar(select(Reader).where(Reader.email == reader.email)):
         raise HTTPException(status_code=400, detail="Email already registered")
     db_reader = Reader(**reader.model_dump())
     db.add(db_reader)
-    db.commit()
-    db.refresh(db_reader)
+    await db.commit()
+    await db.refresh(db_reader)
     return db_reader
\ No newline at end of file
@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.models.models import Book, BookBorrowStats, DailyBorrowStats, Reader, ReaderBorrowStats
+from app.schemas.schemas import BookBorrowStatsRead, DailyBorrowStatsRead, ReaderBorrowStatsRead
+from app.dependencies.dependencies import get_current_user
+from app.core.serialization import json_response, rows_to_dicts
+from app.core.query_budget import query_budget
+
+router = APIRouter()
+
+MAX_TOP = 100
+MAX_DAYS = 366
+
+# Every endpoint reads the summary tables maintained by borrow and return, so
+# the cost depends on the size of the answer, not on the number of borrows.
+# Ties are broken by the highest id, which keeps the order on the count index.
+
+@router.get("/books/top", response_model=List[BookBorrowStatsRead])
+@query_budget(2)
+async def most_borrowed_books(
+    limit: int = Query(10, ge=1, le=MAX_TOP),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    rows = (await db.execute(
+        select(BookBorrowStats.book_id, Book.title, Book.author, BookBorrowStats.borrow_count)
+        .join(Book, Book.id == BookBorrowStats.book_id)
+        .order_by(BookBorrowStats.borrow_count.desc(), BookBorrowStats.book_id.desc())
+        .limit(limit)
+    )).all()
+    return json_response(rows_to_dicts(BookBorrowStatsRead, rows))
+
+@router.get("/readers/top", response_model=List[ReaderBorrowStatsRead])
+@query_budget(2)
+async def busiest_readers(
+    limit: int = Query(10, ge=1, le=MAX_TOP),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    rows = (await db.execute(
+        select(ReaderBorrowStats.reader_id, Reader.name, ReaderBorrowStats.borrow_count)
+        .join(Reader, Reader.id == ReaderBorrowStats.reader_id)
+        .order_by(ReaderBorrowStats.borrow_count.desc(), ReaderBorrowStats.reader_id.desc())
+        .limit(limit)
+    )).all()
+    return json_response(rows_to_dicts(ReaderBorrowStatsRead, rows))
+
+# Borrows and returns per day for the last `days` days, oldest first; days
+# without activity are reported as zeros
+@router.get("/daily", response_model=List[DailyBorrowStatsRead])
+@query_budget(2)
+async def borrows_per_day(
+    days: int = Query(30, ge=1, le=MAX_DAYS),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    # Days are local dates, like the borrow timestamps they come from
+    first = date.today() - timedelta(days=days - 1)
+    totals = {row.day: row for row in (await db.execute(
+        select(DailyBorrowStats.day, func.sum(DailyBorrowStats.borrows).label("borrows"),
+               func.sum(DailyBorrowStats.returns).label("returns"))
+        .where(DailyBorrowStats.day >= first)
+        .group_by(DailyBorrowStats.day)
+    )).all()}
+    items = []
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        row = totals.get(day)
+        items.append({"day": day, "borrows": row.borrows if row else 0, "returns": row.returns if row else 0})
+    return json_response(items)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional
-from datetime import datetime
+from typing import List, Literal, Optional
+from datetime import date, datetime
 
 # ==== Auth & User ==== #
 
@@ -30,6 +30,31 @@ class BookRead(BookBase):
     
     id: int
 
+class BookPage(BaseModel):
+    items: List[BookRead]
+    next_cursor: Optional[str] = None
+
+# Embedded in other resources, without the long description
+class BookSummary(BaseModel):
+    id: int
+    title: str
+    author: str
+    publication_year: Optional[int] = None
+    isbn: Optional[str] = None
+    copies: int
+
+class BulkImportItemResult(BaseModel):
+    index: int
+    status: Literal["created", "updated", "error"]
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkImportResult(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    results: List[BulkImportItemResult]
+
 # ==== Readers ==== #
 
 class ReaderBase(BaseModel):
@@ -44,6 +69,13 @@ class ReaderRead(ReaderBase):
 
     id: int
 
+class ReaderDetail(ReaderRead):
+    active_borrow_count: int
+
+class ReaderPage(BaseModel):
+    items: List[ReaderDetail]
+    next_cursor: Optional[str] = None
+
 # ==== Borrow/Return ==== #
 
 class BorrowRequest(BaseModel):
@@ -62,5 +94,51 @@ class BorrowedBookRead(BaseModel):
     book_id: int
     reader_id: int
     borrow_date: datetime
+    due_date: Optional[datetime] = None
     return_date: Optional[datetime] = None
 
+# GET /borrow/{reader_id}?expand=book
+class BorrowedBookExpanded(BorrowedBookRead):
+    book: Optional[BookSummary] = None
+
+class BorrowHistoryRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    book_id: int
+    reader_id: int
+    borrow_date: datetime
+    due_date: Optional[datetime] = None
+    return_date: datetime
+
+class BorrowHistoryPage(BaseModel):
+    items: List[BorrowHistoryRead]
+    next_cursor: Optional[str] = None
+
+class OverduePage(BaseModel):
+    items: List[BorrowedBookRead]
+    next_cursor: Optional[str] = None
+
+class BatchItemResult(BaseModel):
+    index: int
+    success: bool
+    borrow: Optional[BorrowedBookRead] = None
+    error: Optional[str] = None
+
+# ==== Stats ==== #
+
+class BookBorrowStatsRead(BaseModel):
+    book_id: int
+    title: str
+    author: str
+    borrow_count: int
+
+class ReaderBorrowStatsRead(BaseModel):
+    reader_id: int
+    name: str
+    borrow_count: int
+
+class DailyBorrowStatsRead(BaseModel):
+    day: date
+    borrows: int
+    returns: int
@@ -0,0 +1,177 @@
+"""Seeds a database with a reproducible synthetic library.
+
+    python -m bench.datagen --database-url sqlite:///./bench.db --books 1000000 --readers 100000 --borrows 10000000
+
+The same --seed always produces the same rows. Rows are written with
+multi-row INSERTs in batches, with explicit ids so that borrows can reference
+books and readers without reading them back.
+"""
+import argparse
+import random
+import sys
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.models import Book, Reader, BorrowedBook, User
+from app.core.hashing import pwd_context
+from app.routes.borrow import MAX_ACTIVE_BORROWS
+
+BATCH_SIZE = 10000
+BENCH_PASSWORD = "bench-password"
+
+ADJECTIVES = ("Silent", "Crimson", "Hidden", "Last", "Golden", "Broken", "Distant", "Forgotten", "Quiet", "Endless")
+NOUNS = ("River", "Garden", "Empire", "Winter", "Harbor", "Letter", "Mountain", "Kingdom", "Shadow", "Voyage")
+FIRST_NAMES = ("Ada", "Boris", "Clara", "Dmitri", "Elena", "Farid", "Grace", "Hugo", "Ines", "Jonas", "Kira", "Liam")
+LAST_NAMES = ("Novak", "Okafor", "Petrov", "Quinn", "Rossi", "Sato", "Tanaka", "Ueda", "Varga", "Weber", "Xu", "Young")
+
+BORROW_START = datetime(2020, 1, 1)
+BORROW_SPAN_DAYS = 5 * 365
+LOAN_PERIOD_DAYS = 14
+
+
+def bench_email(index: int) -> str:
+    return f"bench{index}@example.com"
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+# copies is what the borrow route decrements, the copies still on the shelf,
+# so the books out on loan are taken off each book's stock
+def book_rows(rng: random.Random, count: int, on_loan: Counter):
+    authors = [_name(rng) for _ in range(max(count // 20, 1))]
+    for book_id in range(1, count + 1):
+        stock = max(rng.randint(1, 5), on_loan[book_id])
+        yield {
+            "id": book_id,
+            "title": f"The {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {book_id}",
+            "author": rng.choice(authors),
+            "publication_year": rng.randint(1850, 2025),
+            "isbn": f"978{book_id:010d}",
+            "copies": stock - on_loan[book_id],
+            "description": f"A {rng.choice(ADJECTIVES).lower()} story about a {rng.choice(NOUNS).lower()}.",
+        }
+
+
+# Active borrows are dealt to readers round-robin, so nobody exceeds the limit
+def active_borrows(borrows: int, readers: int) -> int:
+    return min(borrows // 50, readers * MAX_ACTIVE_BORROWS)
+
+
+# Book of each active borrow, drawn before the books are written so that
+# their copies and the readers' counters can be derived from them
+def active_loans(rng: random.Random, books: int, active: int) -> list:
+    return [rng.randint(1, books) for _ in range(active)]
+
+
+# Active borrow n goes to reader n % count + 1, see borrow_rows
+def reader_rows(rng: random.Random, count: int, active: int):
+    for reader_id in range(1, count + 1):
+        yield {
+            "id": reader_id,
+            "name": _name(rng),
+            "email": f"reader{reader_id}@example.com",
+            "active_borrow_count": active // count + (1 if reader_id <= active % count else 0),
+        }
+
+
+# The last len(loans) borrows are the active ones
+def borrow_rows(rng: random.Random, count: int, books: int, readers: int, loans: list):
+    first_active = count - len(loans) + 1
+    for borrow_id in range(1, count + 1):
+        borrow_date = BORROW_START + timedelta(seconds=rng.randrange(BORROW_SPAN_DAYS * 86400))
+        closed = borrow_id < first_active
+        loan = borrow_id - first_active
+        yield {
+            "id": borrow_id,
+            "book_id": rng.randint(1, books) if closed else loans[loan],
+            "reader_id": rng.randint(1, readers) if closed else loan % readers + 1,
+            "borrow_date": borrow_date,
+            "due_date": borrow_date + timedelta(days=LOAN_PERIOD_DAYS),
+            "return_date": borrow_date + timedelta(days=rng.randint(1, 60)) if closed else None,
+        }
+
+
+def user_rows(count: int):
+    # One hash for every bench user: hashing is what the login storm measures,
+    # not what seeding should spend its time on
+    hashed_password = pwd_context.hash(BENCH_PASSWORD)
+    for index in range(count):
+        yield {"email": bench_email(index), "hashed_password": hashed_password}
+
+
+def _insert_batches(db: Session, model, rows, label: str):
+    started = time.perf_counter()
+    written = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.execute(insert(model), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(model), batch)
+        written += len(batch)
+    db.commit()
+    elapsed = time.perf_counter() - started
+    print(f"{label:8} {written:>12,} rows in {elapsed:7.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+def seed(database_url: str, books: int, readers: int, borrows: int, users: int, seed: int = 42):
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _fast_load(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA journal_mode=WAL")
+            dbapi_connection.execute("PRAGMA synchronous=OFF")
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    rng = random.Random(seed)
+    active = active_borrows(borrows, readers)
+    loans = active_loans(rng, books, active)
+    with Session(engine) as db:
+        _insert_batches(db, User, user_rows(users), "users")
+        _insert_batches(db, Book, book_rows(rng, books, Counter(loans)), "books")
+        _insert_batches(db, Reader, reader_rows(rng, readers, active), "readers")
+        _insert_batches(db, BorrowedBook, borrow_rows(rng, borrows, books, readers, loans), "borrows")
+
+        # Explicit ids leave PostgreSQL sequences behind
+        if engine.dialect.name == "postgresql":
+            for model in (Book, Reader, BorrowedBook):
+                table = model.__tablename__
+                db.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT coalesce(max(id), 1) FROM {table}))"
+                ))
+        db.execute(text("ANALYZE"))
+        db.commit()
+
+        assert db.scalar(select(func.count()).select_from(BorrowedBook).where(BorrowedBook.return_date == None)) == active
+    engine.dispose()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--readers", type=int, default=100_000)
+    parser.add_argument("--borrows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    seed(args.database_url, args.books, args.readers, args.borrows, args.users, args.seed)
+
+
+if __name__ == "__main__":
+    main()
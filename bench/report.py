@@ -0,0 +1,83 @@
+import json
+import math
+from collections import defaultdict
+
+# A run is flagged when throughput drops or p95 latency grows by more than this
+DEFAULT_TOLERANCE = 0.2
+
+
+def percentile(samples: list, q: float) -> float:
+    # Nearest-rank percentile of a sorted sample list
+    if not samples:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(samples)), 1)
+    return samples[rank - 1]
+
+
+class Recorder:
+    """Collects per-endpoint latencies and status codes for one scenario run."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint: str, seconds: float, status_code: int):
+        self.latencies[endpoint].append(seconds)
+        if status_code >= 500:
+            self.errors[endpoint] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        result = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            result[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors[endpoint],
+                "rps": len(samples) / elapsed,
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+            }
+        return result
+
+
+def format_summary(scenario: str, summary: dict) -> str:
+    lines = [f"== {scenario}", f"{'endpoint':28} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+    for endpoint, stats in summary.items():
+        lines.append(
+            f"{endpoint:28} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>9.1f} "
+            f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """Returns a message for every endpoint that regressed against the baseline.
+    Both arguments map scenario -> endpoint -> stats."""
+    regressions = []
+    for scenario, endpoints in results.items():
+        for endpoint, stats in endpoints.items():
+            reference = baseline.get(scenario, {}).get(endpoint)
+            if reference is None:
+                continue
+            if stats["rps"] < reference["rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{scenario} {endpoint}: throughput {stats['rps']:.1f} req/s, baseline {reference['rps']:.1f}"
+                )
+            if stats["p95_ms"] > reference["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{scenario} {endpoint}: p95 {stats['p95_ms']:.2f} ms, baseline {reference['p95_ms']:.2f}"
+                )
+            if stats["errors"] > reference["errors"]:
+                regressions.append(f"{scenario} {endpoint}: {stats['errors']} errors, baseline {reference['errors']}")
+    return regressions
+
+
+def load_baseline(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: dict):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
@@ -0,0 +1,125 @@
+"""Runs load scenarios in-process against the ASGI app.
+
+    python -m bench.runner --database-url sqlite:///./bench.db --scenario browse,search --duration 30 --concurrency 32
+    python -m bench.runner ... --save-baseline bench/baseline.json
+    python -m bench.runner ... --baseline bench/baseline.json
+
+The database must have been seeded with bench.datagen. Requests go through
+httpx's ASGI transport, so the numbers cover routing, validation, the database
+and serialization but not the network or the HTTP server.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+async def run_scenario(app, scenario, ctx, duration: float, concurrency: int, seed: int = 0) -> dict:
+    import httpx
+    from bench.report import Recorder
+
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    async def worker(client, rng):
+        while time.perf_counter() < deadline:
+            await scenario(client, recorder, ctx, rng)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, random.Random(seed + n)) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return recorder.summary(elapsed)
+
+
+async def build_context(app, engine, tokens: int):
+    import httpx
+    from sqlalchemy import distinct, func, select
+    from sqlalchemy.orm import Session
+    from app.models.models import Book, Reader, User
+    from bench.datagen import BENCH_PASSWORD, bench_email
+    from bench.scenarios import Context
+
+    with Session(engine) as db:
+        ctx = Context(
+            books=db.scalar(select(func.max(Book.id))) or 0,
+            readers=db.scalar(select(func.max(Reader.id))) or 0,
+            users=db.scalar(select(func.count()).select_from(User).where(User.email.like("bench%@example.com"))) or 0,
+            authors=db.scalars(select(distinct(Book.author)).limit(100)).all(),
+        )
+    if not ctx.books or not ctx.users:
+        raise SystemExit("The database has no bench data, run python -m bench.datagen first")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for index in range(min(tokens, ctx.users)):
+            response = await client.post("/auth/login", json={"email": bench_email(index), "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            ctx.tokens.append(response.json()["access_token"])
+    return ctx
+
+
+async def main_async(args) -> int:
+    from app.main import app
+    from app.database import engine, async_engine
+    from app.core.hashing import password_hasher
+    from bench.report import compare, format_summary, load_baseline, save_baseline
+    from bench.scenarios import SCENARIOS
+
+    results = {}
+    try:
+        ctx = await build_context(app, engine, args.tokens)
+        for name in args.scenario.split(","):
+            summary = await run_scenario(app, SCENARIOS[name], ctx, args.duration, args.concurrency, args.seed)
+            results[name] = summary
+            print(format_summary(name, summary))
+            print()
+    finally:
+        password_hasher.shutdown()
+        await async_engine.dispose()
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+        print(f"Baseline written to {args.save_baseline}")
+    if args.baseline:
+        regressions = compare(results, load_baseline(args.baseline), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+    return 0
+
+
+SCENARIO_NAMES = ("browse", "login_storm", "borrow_return", "search")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--scenario", default=",".join(SCENARIO_NAMES), help="comma separated: " + ", ".join(SCENARIO_NAMES))
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--tokens", type=int, default=10, help="logged-in users shared by the scenarios")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="flag regressions against this baseline file")
+    parser.add_argument("--save-baseline", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+    for name in args.scenario.split(","):
+        if name not in SCENARIO_NAMES:
+            parser.error(f"unknown scenario {name}")
+
+    # The app reads its database URL at import time, so it is set before any
+    # module that imports the app is loaded
+    os.environ["DATABASE_URL"] = args.database_url
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import random
+import time
+from dataclasses import dataclass, field
+
+from bench.datagen import ADJECTIVES, BENCH_PASSWORD, NOUNS, bench_email
+
+
+@dataclass
+class Context:
+    """What scenarios know about the seeded database."""
+    books: int
+    readers: int
+    users: int
+    authors: list
+    tokens: list = field(default_factory=list)
+
+    def auth(self, rng: random.Random) -> dict:
+        return {"Authorization": f"Bearer {rng.choice(self.tokens)}"}
+
+
+async def timed(client, recorder, endpoint: str, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    recorder.record(endpoint, time.perf_counter() - started, response.status_code)
+    return response
+
+
+# Each scenario performs one user journey; the runner calls it in a loop from
+# every concurrent worker until the run is over
+
+async def browse(client, recorder, ctx: Context, rng: random.Random):
+    params = {"limit": 50, "sort": rng.choice(("id", "title", "author"))}
+    if rng.random() < 0.3:
+        params["author"] = rng.choice(ctx.authors)
+    cursor = None
+    for _ in range(rng.randint(1, 3)):
+        if cursor:
+            params["cursor"] = cursor
+        response = await timed(client, recorder, "GET /books", "GET", "/books", params=params)
+        cursor = response.json().get("next_cursor") if response.status_code == 200 else None
+        if not cursor:
+            break
+    book_id = rng.randint(1, ctx.books)
+    await timed(client, recorder, "GET /books/{id}", "GET", f"/books/{book_id}", headers=ctx.auth(rng))
+
+
+async def login_storm(client, recorder, ctx: Context, rng: random.Random):
+    credentials = {"email": bench_email(rng.randrange(ctx.users)), "password": BENCH_PASSWORD}
+    await timed(client, recorder, "POST /auth/login", "POST", "/auth/login", json=credentials)
+
+
+async def borrow_return(client, recorder, ctx: Context, rng: random.Random):
+    headers = ctx.auth(rng)
+    request = {"book_id": rng.randint(1, ctx.books), "reader_id": rng.randint(1, ctx.readers)}
+    response = await timed(client, recorder, "POST /borrow", "POST", "/borrow", json=request, headers=headers)
+    if response.status_code == 200:
+        await timed(client, recorder, "POST /return", "POST", "/return",
+                    json={"borrow_id": response.json()["id"]}, headers=headers)
+    await timed(client, recorder, "GET /borrow/{reader_id}", "GET", f"/borrow/{request['reader_id']}", headers=headers)
+
+
+async def search(client, recorder, ctx: Context, rng: random.Random):
+    words = [rng.choice(ADJECTIVES), rng.choice(NOUNS)][:rng.randint(1, 2)]
+    await timed(client, recorder, "GET /books/search", "GET", "/books/search", params={"q": " ".join(words).lower()})
+
+
+SCENARIOS = {
+    "browse": browse,
+    "login_storm": login_storm,
+    "borrow_return": borrow_return,
+    "search": search,
+}
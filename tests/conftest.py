@@ -0,0 +1,25 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from sqlalchemy.engine import Engine
+
+from app.core import query_budget
+from app.core.metrics import instrument_engine
+
+# Every test module builds its own engines, so per-request statement counts
+# are collected on all engines rather than only the app's
+instrument_engine(Engine)
+
+@pytest.fixture(scope="session", autouse=True)
+def enforce_query_budgets():
+    # A route that runs more statements than its @query_budget fails the test
+    query_budget.enforce = True
+    yield
+    query_budget.enforce = False
+
+@pytest.fixture
+def query_counter():
+    with query_budget.count_queries() as counter:
+        yield counter
@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.models.models import Book, Reader, BorrowedBook, User
+from bench.datagen import seed
+from bench.report import Recorder, compare, percentile
+from bench.serialization import check_datetimes
+from app.core import serialization
+
+def test_percentile_nearest_rank():
+    samples = [float(n) for n in range(1, 101)]
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 95) == 95
+    assert percentile(samples, 99) == 99
+    assert percentile([], 99) == 0.0
+
+def test_recorder_summary_counts_server_errors():
+    recorder = Recorder()
+    for status_code in (200, 200, 404, 500):
+        recorder.record("GET /books", 0.01, status_code)
+    stats = recorder.summary(elapsed=2.0)["GET /books"]
+    assert stats["requests"] == 4
+    assert stats["errors"] == 1
+    assert stats["rps"] == 2.0
+
+def test_compare_flags_regressions():
+    baseline = {"browse": {"GET /books": {"rps": 100.0, "p95_ms": 10.0, "errors": 0}}}
+    steady = {"browse": {"GET /books": {"rps": 95.0, "p95_ms": 11.0, "errors": 0}}}
+    slower = {"browse": {"GET /books": {"rps": 60.0, "p95_ms": 20.0, "errors": 0}}}
+    assert compare(steady, baseline) == []
+    assert len(compare(slower, baseline)) == 2
+    # Endpoints without a baseline are not judged
+    assert compare({"search": {"GET /books/search": {"rps": 1.0, "p95_ms": 1e6, "errors": 0}}}, baseline) == []
+
+def test_fast_path_datetimes_match_response_models(monkeypatch):
+    check_datetimes()
+    # The stdlib fallback when orjson is not installed
+    monkeypatch.setattr(serialization, "orjson", None)
+    check_datetimes()
+
+def test_datagen_is_consistent_and_reproducible(tmp_path):
+    url = f"sqlite:///{tmp_path / 'bench.db'}"
+    # 23 readers do not divide the closed borrows, so the round-robin of the
+    # active ones does not start at the first reader
+    seed(url, books=200, readers=23, borrows=3000, users=2, seed=7)
+    engine = create_engine(url)
+    with Session(engine) as db:
+        assert db.scalar(select(func.count()).select_from(Book)) == 200
+        assert db.scalar(select(func.count()).select_from(User)) == 2
+        active = db.execute(
+            select(BorrowedBook.reader_id, func.count())
+            .where(BorrowedBook.return_date == None)
+            .group_by(BorrowedBook.reader_id)
+        ).all()
+        counters = dict(db.execute(select(Reader.id, Reader.active_borrow_count)).all())
+        assert active and all(count <= 3 for _, count in active)
+        assert counters == {reader_id: dict(active).get(reader_id, 0) for reader_id in counters}
+        # Borrowed copies are off the shelf: shelf plus loans is the 1-5 copy stock
+        on_loan = dict(db.execute(
+            select(BorrowedBook.book_id, func.count()).where(BorrowedBook.return_date == None).group_by(BorrowedBook.book_id)
+        ).all())
+        shelf = dict(db.execute(select(Book.id, Book.copies)).all())
+        assert min(shelf.values()) >= 0
+        stock = {book_id: copies + on_loan.get(book_id, 0) for book_id, copies in shelf.items()}
+        assert all(1 <= total <= 5 or total == on_loan[book_id] for book_id, total in stock.items())
+        titles = db.scalars(select(Book.title).order_by(Book.id).limit(5)).all()
+    engine.dispose()
+
+    seed(url, books=200, readers=23, borrows=3000, users=2, seed=7)
+    engine = create_engine(url)
+    with Session(engine) as db:
+        assert db.scalars(select(Book.title).order_by(Book.id).limit(5)).all() == titles
+    engine.dispose()
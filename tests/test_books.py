@@ -5,30 +5,30 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_async_db
 
 # Use test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 # Create fresh DB for tests
 Base.metadata.drop_all(bind=engine)
 Base.metadata.create_all(bind=engine)
 
 # Override DB dependency
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 client = TestClient(app)
 
 @pytest.fixture(scope="module")
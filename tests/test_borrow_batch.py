@@ -0,0 +1,116 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.models.models import Book, Reader
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "cart@example.com", "password": "cartpass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+carts = itertools.count()
+
+@pytest.fixture
+def cart():
+    n = next(carts)
+    with Session(engine) as db:
+        books = [Book(title=f"Cart Book {i}", author="Cart Author", copies=2) for i in range(4)]
+        readers = [Reader(name=f"Cart Reader {i}", email=f"cart{n}-{i}@example.com") for i in range(2)]
+        db.add_all(books + readers)
+        db.commit()
+        return {"books": [b.id for b in books], "readers": [r.id for r in readers]}
+
+def state(cart):
+    with Session(engine) as db:
+        copies = db.scalars(select(Book.copies).where(Book.id.in_(cart["books"])).order_by(Book.id)).all()
+        active = db.scalars(select(Reader.active_borrow_count).where(Reader.id.in_(cart["readers"])).order_by(Reader.id)).all()
+    return copies, active
+
+def test_borrow_batch_reports_each_item(test_auth_token, cart):
+    b, r = cart["books"], cart["readers"]
+    res = client.post("/borrow/batch", json=[
+        {"book_id": b[0], "reader_id": r[0]},
+        {"book_id": b[0], "reader_id": r[1]},
+        {"book_id": b[0], "reader_id": r[1]},
+        {"book_id": 999999, "reader_id": r[0]},
+        {"book_id": b[1], "reader_id": 999999},
+        {"book_id": b[1], "reader_id": r[0]},
+        {"book_id": b[2], "reader_id": r[0]},
+        {"book_id": b[3], "reader_id": r[0]},
+    ], headers=test_auth_token)
+    assert res.status_code == 200
+    results = res.json()
+    assert [item["success"] for item in results] == [True, True, False, False, False, True, True, False]
+    assert [item["error"] for item in results if not item["success"]] == [
+        "No copies available", "Book not found", "Reader not found", "Reader has already borrowed 3 books"
+    ]
+    assert results[0]["borrow"]["book_id"] == b[0]
+    assert results[5]["borrow"]["reader_id"] == r[0]
+    assert state(cart) == ([0, 1, 1, 2], [3, 1])
+
+def test_return_batch_by_id_and_pair(test_auth_token, cart):
+    b, r = cart["books"], cart["readers"]
+    borrowed = client.post("/borrow/batch", json=[
+        {"book_id": b[0], "reader_id": r[0]},
+        {"book_id": b[1], "reader_id": r[0]},
+        {"book_id": b[1], "reader_id": r[1]},
+    ], headers=test_auth_token).json()
+    first_id = borrowed[0]["borrow"]["id"]
+
+    res = client.post("/return/batch", json=[
+        {"borrow_id": first_id},
+        {"borrow_id": first_id},
+        {"book_id": b[1], "reader_id": r[0]},
+        {"book_id": b[1], "reader_id": r[0]},
+        {"book_id": b[1]},
+    ], headers=test_auth_token)
+    assert res.status_code == 200
+    results = res.json()
+    assert [item["success"] for item in results] == [True, False, True, False, False]
+    assert results[0]["borrow"]["return_date"] is not None
+    assert results[4]["error"] == "Invalid return request"
+    assert state(cart) == ([2, 1, 2, 2], [0, 1])
+
+def test_batch_round_trips_do_not_grow_with_cart(test_auth_token, cart, query_counter):
+    b, r = cart["books"], cart["readers"]
+    client.post("/borrow/batch", json=[{"book_id": b[0], "reader_id": r[0]}], headers=test_auth_token)
+    small = query_counter.count
+    query_counter.statements.clear()
+    client.post("/borrow/batch", json=[{"book_id": book_id, "reader_id": r[1]} for book_id in b[1:]], headers=test_auth_token)
+    assert query_counter.count == small
+
+def test_batch_size_is_bounded(test_auth_token, cart):
+    too_many = [{"book_id": cart["books"][0], "reader_id": cart["readers"][0]}] * 101
+    assert client.post("/borrow/batch", json=too_many, headers=test_auth_token).status_code == 422
+    assert client.post("/return/batch", json=[], headers=test_auth_token).status_code == 422
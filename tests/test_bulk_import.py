@@ -0,0 +1,91 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+
+# Use test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Create fresh DB for tests
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+# Override DB dependency
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_user():
+    user_data = {"email": "test@example.com", "password": "testpass"}
+    client.post("/auth/register", json=user_data)
+    response = client.post("/auth/login", json=user_data)
+    token = response.json()["access_token"]
+    return {"token": token, "headers": {"Authorization": f"Bearer {token}"}}
+
+def bulk_book(i, **overrides):
+    book = {
+        "title": f"Bulk Book {i}",
+        "author": "Bulk Author",
+        "publication_year": 2010,
+        "isbn": f"BULK{i}",
+        "copies": 1
+    }
+    book.update(overrides)
+    return book
+
+def test_bulk_import_json_creates_books(test_user):
+    res = client.post("/books/bulk", json=[bulk_book(i) for i in range(3)], headers=test_user["headers"])
+    assert res.status_code == 200
+    data = res.json()
+    assert (data["created"], data["updated"], data["failed"]) == (3, 0, 0)
+    assert [r["index"] for r in data["results"]] == [0, 1, 2]
+
+    book = client.get(f"/books/{data['results'][1]['id']}", headers=test_user["headers"]).json()
+    assert book["isbn"] == "BULK1"
+
+def test_bulk_import_ndjson_upserts_on_isbn(test_user):
+    body = "\n".join(json.dumps(b) for b in [bulk_book(0, copies=7), bulk_book(3)])
+    headers = dict(test_user["headers"], **{"Content-Type": "application/x-ndjson"})
+    res = client.post("/books/bulk", content=body, headers=headers)
+    assert res.status_code == 200
+    data = res.json()
+    assert [r["status"] for r in data["results"]] == ["updated", "created"]
+
+    book = client.get(f"/books/{data['results'][0]['id']}", headers=test_user["headers"]).json()
+    assert book["copies"] == 7
+    assert client.get("/books", params={"isbn": "BULK0"}).json()["items"][0]["copies"] == 7
+
+def test_bulk_import_reports_invalid_items(test_user):
+    items = [bulk_book(4), {"title": "No author"}, bulk_book(4, title="Duplicate"), bulk_book(5, copies=-1), bulk_book(6, isbn=None)]
+    res = client.post("/books/bulk", json=items, headers=test_user["headers"])
+    assert res.status_code == 200
+    data = res.json()
+    assert [r["status"] for r in data["results"]] == ["created", "error", "error", "error", "created"]
+    assert data["results"][2]["error"] == "Duplicate ISBN in request"
+    assert (data["created"], data["failed"]) == (2, 3)
+    assert data["results"][4]["id"] is not None
+
+def test_bulk_import_rejects_malformed_body(test_user):
+    headers = dict(test_user["headers"], **{"Content-Type": "application/json"})
+    assert client.post("/books/bulk", content="{not json", headers=headers).status_code == 400
+    assert client.post("/books/bulk", json={"title": "x"}, headers=test_user["headers"]).status_code == 400
+    assert client.post("/books/bulk", json=[]).status_code == 401
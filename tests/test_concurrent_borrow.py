@@ -0,0 +1,127 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.models.models import Book, Reader, BorrowedBook
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+COPIES = 25
+READERS = 100
+BORROWS_PER_READER = 3
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "stress@example.com", "password": "stresspass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+# A few pooled connections let transactions interleave on SQLite while keeping
+# the burst from queueing on SQLite's sleeping busy handler. Every request is in
+# flight at once; the guarded statements are what keep the counts consistent.
+stress_engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"),
+    pool_size=5,
+    max_overflow=0,
+    pool_timeout=60,
+    connect_args={"timeout": 60},
+)
+StressSessionLocal = async_sessionmaker(bind=stress_engine, autoflush=False, expire_on_commit=False)
+
+async def override_stress_db():
+    async with StressSessionLocal() as db:
+        yield db
+
+@pytest.fixture(scope="module", autouse=True)
+def stress_db():
+    previous = app.dependency_overrides.get(get_async_db)
+    app.dependency_overrides[get_async_db] = override_stress_db
+    yield
+    app.dependency_overrides[get_async_db] = previous
+
+@pytest.fixture(scope="module")
+def contested_book():
+    with Session(engine) as db:
+        book = Book(title="Contested Book", author="Stress Author", isbn="STRESS1", copies=COPIES)
+        readers = [Reader(name=f"Stress Reader {i}", email=f"stress{i}@example.com") for i in range(READERS)]
+        db.add(book)
+        db.add_all(readers)
+        db.commit()
+        return {"book_id": book.id, "reader_ids": [r.id for r in readers]}
+
+async def fire(requests):
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.post(path, json=body, headers=headers) for path, body, headers in requests))
+    finally:
+        await stress_engine.dispose()
+
+def count_state(book_id):
+    with Session(engine) as db:
+        copies = db.scalar(select(Book.copies).where(Book.id == book_id))
+        active = db.scalar(select(func.count()).select_from(BorrowedBook).where(
+            BorrowedBook.book_id == book_id,
+            BorrowedBook.return_date == None
+        ))
+        counted = db.scalar(select(func.sum(Reader.active_borrow_count)).where(
+            Reader.id.in_(select(BorrowedBook.reader_id).where(BorrowedBook.book_id == book_id))
+        ))
+    assert counted == active
+    return copies, active
+
+def test_parallel_borrows_never_oversell(test_auth_token, contested_book):
+    book_id = contested_book["book_id"]
+    requests = [
+        ("/borrow", {"book_id": book_id, "reader_id": reader_id}, test_auth_token)
+        for reader_id in contested_book["reader_ids"]
+        for _ in range(BORROWS_PER_READER)
+    ]
+    responses = asyncio.run(fire(requests))
+
+    succeeded = [r for r in responses if r.status_code == 200]
+    assert len(succeeded) == COPIES
+    assert all(r.status_code == 400 for r in responses if r.status_code != 200)
+    assert count_state(book_id) == (0, COPIES)
+
+def test_parallel_returns_are_counted_once(test_auth_token, contested_book):
+    book_id = contested_book["book_id"]
+    with Session(engine) as db:
+        borrow_ids = db.scalars(select(BorrowedBook.id).where(
+            BorrowedBook.book_id == book_id,
+            BorrowedBook.return_date == None
+        )).all()
+
+    requests = [("/return", {"borrow_id": borrow_id}, test_auth_token) for borrow_id in borrow_ids for _ in range(4)]
+    responses = asyncio.run(fire(requests))
+
+    assert sum(r.status_code == 200 for r in responses) == len(borrow_ids)
+    assert all(r.status_code == 404 for r in responses if r.status_code != 200)
+    assert count_state(book_id) == (COPIES, 0)
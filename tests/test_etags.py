@@ -0,0 +1,123 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "etag@example.com", "password": "etagpass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def create_book(headers, title="ETag Book", copies=2):
+    book = {"title": title, "author": "ETag Author", "copies": copies}
+    response = client.post("/books", json=book, headers=headers)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+def test_get_book_returns_304_when_unchanged(test_auth_token, query_counter):
+    book_id = create_book(test_auth_token)
+    response = client.get(f"/books/{book_id}", headers=test_auth_token)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag == f'"{book_id}.1"'
+
+    query_counter.statements.clear()
+    response = client.get(f"/books/{book_id}", headers={**test_auth_token, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    # Only the version is read, never the row itself
+    book_queries = [s for s in query_counter.statements if "FROM books" in s]
+    assert len(book_queries) == 1
+    assert "books.title" not in book_queries[0]
+
+def test_updates_bump_version(test_auth_token):
+    book_id = create_book(test_auth_token)
+    etag = client.get(f"/books/{book_id}", headers=test_auth_token).headers["ETag"]
+
+    reader = client.post("/readers", json={"name": "ETag Reader", "email": "etag-reader@example.com"}, headers=test_auth_token)
+    borrow = client.post("/borrow", json={"book_id": book_id, "reader_id": reader.json()["id"]}, headers=test_auth_token)
+    assert borrow.status_code == 200
+
+    response = client.get(f"/books/{book_id}", headers={**test_auth_token, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{book_id}.2"'
+
+    client.post("/return", json={"borrow_id": borrow.json()["id"]}, headers=test_auth_token)
+    assert client.get(f"/books/{book_id}", headers=test_auth_token).headers["ETag"] == f'"{book_id}.3"'
+
+def test_put_with_if_match(test_auth_token):
+    book_id = create_book(test_auth_token)
+    etag = client.get(f"/books/{book_id}", headers=test_auth_token).headers["ETag"]
+    update = {"title": "ETag Book Revised", "author": "ETag Author", "copies": 2}
+
+    response = client.put(f"/books/{book_id}", json=update, headers={**test_auth_token, "If-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["title"] == "ETag Book Revised"
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+
+    # A writer holding the old version loses
+    response = client.put(f"/books/{book_id}", json={**update, "copies": 9}, headers={**test_auth_token, "If-Match": etag})
+    assert response.status_code == 412
+    assert client.get(f"/books/{book_id}", headers=test_auth_token).json()["copies"] == 2
+
+    # The weak tag of a gzipped response names the same version; a sparse tag does not
+    response = client.put(f"/books/{book_id}", json=update, headers={**test_auth_token, "If-Match": "W/" + new_etag})
+    assert response.status_code == 200
+    sparse = client.get(f"/books/{book_id}", params={"fields": "title"}, headers=test_auth_token).headers["ETag"]
+    response = client.put(f"/books/{book_id}", json=update, headers={**test_auth_token, "If-Match": sparse})
+    assert response.status_code == 412
+
+    response = client.put(f"/books/{book_id}", json=update, headers={**test_auth_token, "If-Match": '"not-an-etag"'})
+    assert response.status_code == 412
+    response = client.put(f"/books/999999", json=update, headers={**test_auth_token, "If-Match": "*"})
+    assert response.status_code == 404
+
+def test_list_books_collection_etag(test_auth_token):
+    create_book(test_auth_token, title="ETag Listed")
+    params = {"author": "ETag Author", "limit": 100}
+    response = client.get("/books", params=params)
+    etag = response.headers["ETag"]
+
+    response = client.get("/books", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    # The tag depends on the representation, not only the rows
+    response = client.get("/books", params={**params, "order": "desc"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+    book_id = create_book(test_auth_token, title="ETag Listed Later")
+    response = client.get("/books", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    client.put(f"/books/{book_id}", json={"title": "Renamed", "author": "ETag Author", "copies": 1}, headers=test_auth_token)
+    stale = response.headers["ETag"]
+    assert client.get("/books", params=params, headers={"If-None-Match": stale}).status_code == 200
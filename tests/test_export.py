@@ -0,0 +1,87 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import csv
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+
+# Use test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Create fresh DB for tests
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+# Override DB dependency
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_user():
+    user_data = {"email": "test@example.com", "password": "testpass"}
+    client.post("/auth/register", json=user_data)
+    response = client.post("/auth/login", json=user_data)
+    token = response.json()["access_token"]
+    return {"token": token, "headers": {"Authorization": f"Bearer {token}"}}
+
+@pytest.fixture(scope="module")
+def exported_books(test_user):
+    ids = []
+    for i in range(3):
+        res = client.post("/books", json={
+            "title": f"Export Book {i}",
+            "author": "Export Author",
+            "publication_year": 1990 + i,
+            "isbn": f"EXPORT{i}",
+            "copies": 2,
+            "description": "Line one, with a comma\nand a newline"
+        }, headers=test_user["headers"])
+        ids.append(res.json()["id"])
+    return ids
+
+def test_export_ndjson(test_user, exported_books):
+    res = client.get("/books/export", headers=test_user["headers"])
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert [r["id"] for r in rows] == sorted(r["id"] for r in rows)
+    exported = {r["id"]: r for r in rows}
+    for book_id in exported_books:
+        assert exported[book_id]["author"] == "Export Author"
+        assert exported[book_id]["description"] == "Line one, with a comma\nand a newline"
+
+def test_export_csv(test_user, exported_books):
+    res = client.get("/books/export", params={"format": "csv"}, headers=test_user["headers"])
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    exported = {int(r["id"]): r for r in rows}
+    for book_id in exported_books:
+        assert exported[book_id]["copies"] == "2"
+        assert exported[book_id]["description"] == "Line one, with a comma\nand a newline"
+
+def test_export_requires_token_and_known_format(test_user):
+    assert client.get("/books/export").status_code == 401
+    res = client.get("/books/export", params={"format": "xml"}, headers=test_user["headers"])
+    assert res.status_code == 422
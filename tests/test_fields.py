@@ -0,0 +1,114 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+AUTHOR = "Sparse Author"
+DESCRIPTION = "A long description. " * 100
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "fields@example.com", "password": "fieldspass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture(scope="module")
+def books(test_auth_token):
+    return [
+        client.post("/books", json={"title": f"Sparse {n}", "author": AUTHOR, "copies": n, "description": DESCRIPTION},
+                    headers=test_auth_token).json()
+        for n in range(5)
+    ]
+
+def test_list_leaves_description_out_by_default(books, query_counter):
+    items = client.get("/books", params={"author": AUTHOR}).json()["items"]
+    assert len(items) == 5
+    assert all("description" not in item for item in items)
+    assert all("description" not in statement for statement in query_counter.statements)
+
+def test_list_projects_requested_fields(books, query_counter):
+    items = client.get("/books", params={"author": AUTHOR, "fields": "title,copies"}).json()["items"]
+    assert items[0] == {"id": books[0]["id"], "title": "Sparse 0", "copies": 0}
+    selected = query_counter.statements[-1].split("FROM")[0]
+    assert "author" not in selected and "isbn" not in selected
+
+def test_list_can_ask_for_description(books):
+    items = client.get("/books", params={"author": AUTHOR, "fields": "description"}).json()["items"]
+    assert items[0] == {"id": books[0]["id"], "description": DESCRIPTION}
+
+def test_sparse_pages_keep_paging_by_an_unrequested_sort_key(books):
+    params = {"author": AUTHOR, "fields": "copies", "sort": "title", "limit": 3}
+    first = client.get("/books", params=params).json()
+    second = client.get("/books", params={**params, "cursor": first["next_cursor"]}).json()
+    assert [item["id"] for item in first["items"] + second["items"]] == [book["id"] for book in books]
+    assert set(first["items"][0]) == {"id", "copies"}
+
+def test_unknown_field_is_rejected(test_auth_token, books):
+    response = client.get("/books", params={"fields": "title,secret"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: secret"
+    assert client.get(f"/books/{books[0]['id']}", params={"fields": "nope"}, headers=test_auth_token).status_code == 400
+
+def test_get_book_projects_fields(books, test_auth_token):
+    book_id = books[1]["id"]
+    full = client.get(f"/books/{book_id}", headers=test_auth_token)
+    assert full.json()["description"] == DESCRIPTION
+
+    sparse = client.get(f"/books/{book_id}", params={"fields": "title,copies"}, headers=test_auth_token)
+    assert sparse.json() == {"id": book_id, "title": "Sparse 1", "copies": 1}
+    assert sparse.headers["ETag"] != full.headers["ETag"]
+    revalidated = client.get(f"/books/{book_id}", params={"fields": "copies,title"},
+                             headers={**test_auth_token, "If-None-Match": sparse.headers["ETag"]})
+    assert revalidated.status_code == 304
+    other_fields = client.get(f"/books/{book_id}", params={"fields": "title"},
+                              headers={**test_auth_token, "If-None-Match": sparse.headers["ETag"]})
+    assert other_fields.status_code == 200
+    full_revalidated = client.get(f"/books/{book_id}", headers={**test_auth_token, "If-None-Match": full.headers["ETag"]})
+    assert full_revalidated.status_code == 304
+
+def test_large_responses_are_gzipped(books, test_auth_token):
+    large = client.get("/books", params={"author": AUTHOR, "fields": "description"}, headers={"Accept-Encoding": "gzip"})
+    assert large.headers["Content-Encoding"] == "gzip"
+    assert int(large.headers["Content-Length"]) < len(large.content)
+
+    small = client.get(f"/books/{books[0]['id']}", params={"fields": "title"}, headers={**test_auth_token, "Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+
+    plain = client.get("/books", params={"author": AUTHOR, "fields": "description", "limit": 4}, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+
+def test_gzipped_responses_carry_weak_etags(books):
+    params = {"author": AUTHOR, "fields": "description"}
+    plain = client.get("/books", params=params, headers={"Accept-Encoding": "identity"})
+    large = client.get("/books", params=params, headers={"Accept-Encoding": "gzip"})
+    assert large.headers["Content-Encoding"] == "gzip"
+    assert large.headers["ETag"] == "W/" + plain.headers["ETag"]
+
+    revalidated = client.get("/books", params=params, headers={"Accept-Encoding": "gzip", "If-None-Match": large.headers["ETag"]})
+    assert revalidated.status_code == 304
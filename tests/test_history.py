@@ -0,0 +1,106 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.models.models import BorrowedBook, BorrowedBookHistory
+from app.core.archive import archive_returned_borrows, month_partitions
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "history@example.com", "password": "historypass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def archive(**kwargs):
+    async def run():
+        async with TestingSessionLocal() as db:
+            return await archive_returned_borrows(db, **kwargs)
+    return asyncio.run(run())
+
+@pytest.fixture(scope="module")
+def lending(test_auth_token):
+    book = client.post("/books", json={"title": "Archived", "author": "History Author", "copies": 2}, headers=test_auth_token).json()
+    reader = client.post("/readers", json={"name": "History Reader", "email": "history-reader@example.com"}, headers=test_auth_token).json()
+    returned = []
+    for _ in range(5):
+        borrow = client.post("/borrow", json={"book_id": book["id"], "reader_id": reader["id"]}, headers=test_auth_token).json()
+        client.post("/return", json={"borrow_id": borrow["id"]}, headers=test_auth_token)
+        returned.append(borrow["id"])
+    active = client.post("/borrow", json={"book_id": book["id"], "reader_id": reader["id"]}, headers=test_auth_token).json()
+    return {"book_id": book["id"], "reader_id": reader["id"], "returned": returned, "active": active["id"]}
+
+def test_archive_moves_returned_borrows_in_batches(lending):
+    # Nothing was returned a day ago yet
+    assert archive(older_than=timedelta(days=1)) == 0
+    assert archive(batch_size=2) >= 5
+
+    with Session(engine) as db:
+        hot = db.scalars(select(BorrowedBook.id).where(BorrowedBook.reader_id == lending["reader_id"])).all()
+        archived = db.scalars(select(BorrowedBookHistory.id).where(BorrowedBookHistory.reader_id == lending["reader_id"])).all()
+        assert db.scalar(select(func.count()).select_from(BorrowedBook).where(BorrowedBook.return_date != None)) == 0
+    assert hot == [lending["active"]]
+    assert sorted(archived) == lending["returned"]
+
+def test_reader_history_is_paginated_newest_first(lending, test_auth_token):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get(f"/readers/{lending['reader_id']}/history", params=params, headers=test_auth_token).json()
+        assert len(page["items"]) <= 2
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == list(reversed(lending["returned"]))
+
+def test_book_history(lending, test_auth_token):
+    page = client.get(f"/books/{lending['book_id']}/history", headers=test_auth_token).json()
+    assert [item["id"] for item in page["items"]] == list(reversed(lending["returned"]))
+    assert all(item["return_date"] for item in page["items"])
+    assert page["next_cursor"] is None
+
+def test_history_rejects_bad_cursor(lending, test_auth_token):
+    response = client.get(f"/readers/{lending['reader_id']}/history", params={"cursor": "garbage"}, headers=test_auth_token)
+    assert response.status_code == 400
+    assert client.get(f"/readers/{lending['reader_id']}/history").status_code == 401
+
+def test_archived_borrow_cannot_be_returned_again(lending, test_auth_token):
+    response = client.post("/return", json={"borrow_id": lending["returned"][0]}, headers=test_auth_token)
+    assert response.status_code == 404
+
+def test_month_partitions():
+    partitions = month_partitions(datetime(2024, 11, 15), datetime(2025, 1, 3))
+    assert [name for name, _, _ in partitions] == [
+        "borrowed_books_history_2024_11", "borrowed_books_history_2024_12", "borrowed_books_history_2025_01",
+    ]
+    assert partitions[1][1:] == (datetime(2024, 12, 1), datetime(2025, 1, 1))
@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.core.metrics import Histogram
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "metrics@example.com", "password": "metricspass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def sample(text, name, **labels):
+    selector = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}{{{re.escape(selector)}[^}}]*}} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+def test_metrics_are_labelled_by_route_template(test_auth_token):
+    before = client.get("/metrics").text
+    book = client.post("/books", json={"title": "Measured", "author": "Metrics Author"}, headers=test_auth_token).json()
+    client.get(f"/books/{book['id']}", headers=test_auth_token)
+    client.get("/books/999999", headers=test_auth_token)
+    client.get("/no/such/path")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert f"/books/{book['id']}" not in text
+
+    route = {"method": "GET", "route": "/books/{book_id}"}
+    assert sample(text, "http_requests_total", **route, status=200) == sample(before, "http_requests_total", **route, status=200) + 1
+    assert sample(text, "http_requests_total", **route, status=404) == sample(before, "http_requests_total", **route, status=404) + 1
+    assert sample(text, "http_requests_total", method="GET", route="<unmatched>", status=404) >= 1
+    assert sample(text, "http_request_duration_seconds_count", **route) >= 2
+    assert sample(text, "http_requests_in_progress", **route) == 0
+    # The scrape itself is in flight while it renders
+    assert sample(text, "http_requests_in_progress", method="GET", route="/metrics") == 1
+
+def test_sql_statements_are_counted_per_request(test_auth_token):
+    before = client.get("/metrics").text
+    client.post("/readers", json={"name": "Metrics Reader", "email": "metrics-reader@example.com"}, headers=test_auth_token)
+    text = client.get("/metrics").text
+
+    route = {"method": "POST", "route": "/readers"}
+    assert sample(text, "http_request_db_queries_count", **route) == sample(before, "http_request_db_queries_count", **route) + 1
+    queries = sample(text, "http_request_db_queries_sum", **route) - sample(before, "http_request_db_queries_sum", **route)
+    # user lookup, email check, insert, refresh (the token may already be cached)
+    assert 3 <= queries <= 5
+    assert sample(text, "http_request_db_duration_seconds_sum", **route) > 0
+
+def test_cache_stats_are_exported():
+    text = client.get("/metrics").text
+    assert re.search(r'^cache_hits\{cache="catalogue"\} ', text, re.MULTILINE)
+    assert re.search(r'^cache_hit_ratio\{cache="users"\} ', text, re.MULTILINE)
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, ("/x",))
+    lines = histogram.expose()
+    assert 'latency_seconds_bucket{route="/x",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/x",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/x"} 4' in lines
@@ -0,0 +1,99 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "multiget@example.com", "password": "multigetpass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture(scope="module")
+def books(test_auth_token):
+    return [
+        client.post("/books", json={"title": f"Multi {n}", "author": "Multi Author", "copies": 2, "description": "Long"},
+                    headers=test_auth_token).json()["id"]
+        for n in range(3)
+    ]
+
+@pytest.fixture(scope="module")
+def readers(test_auth_token):
+    return [
+        client.post("/readers", json={"name": f"Multi Reader {n}", "email": f"multi-reader-{n}@example.com"},
+                    headers=test_auth_token).json()["id"]
+        for n in range(3)
+    ]
+
+def ids(values) -> str:
+    return ",".join(str(value) for value in values)
+
+def test_books_by_ids_keep_request_order(books, query_counter):
+    requested = [books[2], books[0], 999999, books[1], books[2]]
+    response = client.get("/books", params={"ids": ids(requested)})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [books[2], books[0], books[1]]
+    assert response.json()["next_cursor"] is None
+    assert query_counter.count == 1
+
+def test_books_by_ids_support_fields_and_etags(books):
+    response = client.get("/books", params={"ids": ids(books), "fields": "title"})
+    assert response.json()["items"][0] == {"id": books[0], "title": "Multi 0"}
+    revalidated = client.get("/books", params={"ids": ids(books), "fields": "title"}, headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+@pytest.mark.parametrize("value", ["1,x", ",", ",".join(str(n) for n in range(1, 502)), "99999999999999999999", "2147483648", "0"])
+def test_invalid_ids_are_rejected(value, test_auth_token):
+    assert client.get("/books", params={"ids": value}).status_code == 400
+    assert client.get("/readers", params={"ids": value}, headers=test_auth_token).status_code == 400
+
+@pytest.mark.parametrize("extra", [{"author": "Someone"}, {"year_from": 2000}, {"sort": "title"}, {"limit": 5}, {"cursor": "abc"}])
+def test_ids_reject_list_parameters(books, extra):
+    response = client.get("/books", params={"ids": ids(books), **extra})
+    assert response.status_code == 400
+    assert next(iter(extra)) in response.json()["detail"]
+
+def test_readers_by_ids(readers, test_auth_token):
+    response = client.get("/readers", params={"ids": ids(reversed(readers))}, headers=test_auth_token)
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()["items"]] == ["Multi Reader 2", "Multi Reader 1", "Multi Reader 0"]
+    assert client.get("/readers", params={"ids": ids(readers)}).status_code == 401
+
+def test_borrow_listing_expands_books(books, readers, test_auth_token, query_counter):
+    for book_id in books[:2]:
+        client.post("/borrow", json={"book_id": book_id, "reader_id": readers[0]}, headers=test_auth_token)
+    plain = client.get(f"/borrow/{readers[0]}", headers=test_auth_token).json()
+    assert all("book" not in item for item in plain)
+
+    query_counter.statements.clear()
+    expanded = client.get(f"/borrow/{readers[0]}", params={"expand": "book"}, headers=test_auth_token).json()
+    assert len(query_counter.statements) <= 2
+    assert sorted(item["book"]["title"] for item in expanded) == ["Multi 0", "Multi 1"]
+    assert all(item["book"]["id"] == item["book_id"] and "description" not in item["book"] for item in expanded)
+    assert client.get(f"/borrow/{readers[0]}", params={"expand": "reader"}, headers=test_auth_token).status_code == 422
@@ -0,0 +1,166 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.models.models import BorrowedBook, JobWatermark
+from app.core.overdue import FileSender, OverdueNotice, WATERMARK_NAME, scan_overdue
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "overdue@example.com", "password": "overduepass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+class RecordingSender:
+    def __init__(self, fail: bool = False, delay: float = 0):
+        self.fail = fail
+        self.delay = delay
+        self.sent = []
+
+    async def send(self, notices):
+        if self.fail:
+            raise ConnectionError("mail server unavailable")
+        await asyncio.sleep(self.delay)
+        self.sent.extend(notice.borrow_id for notice in notices)
+
+def scan(sender, **kwargs):
+    async def run():
+        async with TestingSessionLocal() as db:
+            return await scan_overdue(db, sender, **kwargs)
+    return asyncio.run(run())
+
+def set_due_date(borrow_id: int, due_date: datetime):
+    with Session(engine) as db:
+        db.execute(update(BorrowedBook).where(BorrowedBook.id == borrow_id).values(due_date=due_date))
+        db.commit()
+
+@pytest.fixture(scope="module")
+def borrower(test_auth_token):
+    book = client.post("/books", json={"title": "Overdue Book", "author": "Late Author", "copies": 10}, headers=test_auth_token).json()
+    readers = iter(range(1000))
+
+    # A reader per borrow keeps clear of the active borrow limit
+    def borrow(due_date: datetime) -> int:
+        email = f"late-reader-{next(readers)}@example.com"
+        reader = client.post("/readers", json={"name": "Late Reader", "email": email}, headers=test_auth_token).json()
+        borrow_id = client.post("/borrow", json={"book_id": book["id"], "reader_id": reader["id"]}, headers=test_auth_token).json()["id"]
+        set_due_date(borrow_id, due_date)
+        return borrow_id
+    return borrow
+
+def test_borrow_sets_due_date(test_auth_token):
+    book = client.post("/books", json={"title": "Due Book", "author": "Due Author", "copies": 1}, headers=test_auth_token).json()
+    reader = client.post("/readers", json={"name": "Due Reader", "email": "due-reader@example.com"}, headers=test_auth_token).json()
+    borrow = client.post("/borrow", json={"book_id": book["id"], "reader_id": reader["id"]}, headers=test_auth_token).json()
+    borrow_date, due_date = datetime.fromisoformat(borrow["borrow_date"]), datetime.fromisoformat(borrow["due_date"])
+    assert due_date - borrow_date == timedelta(days=14)
+
+def test_scan_sends_only_newly_overdue_borrows(borrower):
+    now = datetime.now()
+    first, second = borrower(now - timedelta(days=2)), borrower(now - timedelta(days=1))
+
+    sender = RecordingSender()
+    assert scan(sender, batch_size=1) >= 2
+    assert sender.sent.index(first) < sender.sent.index(second)
+    with Session(engine) as db:
+        watermark = db.get(JobWatermark, WATERMARK_NAME)
+        assert (watermark.position_date, watermark.position_id) >= (now - timedelta(days=1), second)
+
+    # The watermark persists, so a second scan has nothing to send
+    sender = RecordingSender()
+    assert scan(sender) == 0
+    assert sender.sent == []
+
+    third = borrower(now - timedelta(hours=1))
+    assert scan(sender) == 1
+    assert sender.sent == [third]
+
+def test_failed_send_does_not_advance_the_watermark(borrower):
+    borrow_id = borrower(datetime.now() + timedelta(days=1))
+    later = datetime.now() + timedelta(days=2)
+
+    with pytest.raises(ConnectionError):
+        scan(RecordingSender(fail=True), now=later)
+    sender = RecordingSender()
+    scan(sender, now=later)
+    assert borrow_id in sender.sent
+
+def test_concurrent_scans_notify_each_borrow_once(borrower):
+    later = datetime.now() + timedelta(days=30)
+    borrow_ids = [borrower(later - timedelta(hours=n)) for n in range(4)]
+
+    # Two workers whose schedules line up, each sending slowly enough to overlap
+    async def run():
+        async def one(sender):
+            async with TestingSessionLocal() as db:
+                return await scan_overdue(db, sender, batch_size=2, now=later)
+        senders = [RecordingSender(delay=0.1), RecordingSender(delay=0.1)]
+        await asyncio.gather(*(one(sender) for sender in senders))
+        return senders[0].sent + senders[1].sent
+
+    sent = asyncio.run(run())
+    assert sorted(borrow_id for borrow_id in sent if borrow_id in borrow_ids) == sorted(borrow_ids)
+    assert len(sent) == len(set(sent))
+
+def test_file_sender_writes_json_lines(tmp_path):
+    path = tmp_path / "notices.log"
+    notices = [
+        OverdueNotice(borrow_id=n, reader_name="Reader", reader_email="reader@example.com",
+                      book_title="Title", due_date=datetime(2026, 1, n))
+        for n in (1, 2)
+    ]
+    asyncio.run(FileSender(str(path)).send(notices))
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["borrow_id"] for line in lines] == [1, 2]
+    assert lines[0]["reader_email"] == "reader@example.com"
+
+def test_overdue_endpoint_paginates_by_due_date(borrower, test_auth_token):
+    now = datetime.now()
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 1, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/overdue", params=params, headers=test_auth_token).json()
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) >= 3
+    due_dates = [datetime.fromisoformat(item["due_date"]) for item in seen]
+    assert due_dates == sorted(due_dates)
+    assert all(due < now for due in due_dates)
+    assert all(item["return_date"] is None for item in seen)
+
+def test_overdue_rejects_bad_cursor(test_auth_token):
+    response = client.get("/overdue", params={"cursor": "nope"}, headers=test_auth_token)
+    assert response.status_code == 400
@@ -0,0 +1,110 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.core.pagination import encode_cursor
+
+# Use test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Create fresh DB for tests
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+# Override DB dependency
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_user():
+    user_data = {"email": "test@example.com", "password": "testpass"}
+    client.post("/auth/register", json=user_data)
+    response = client.post("/auth/login", json=user_data)
+    token = response.json()["access_token"]
+    return {"token": token, "headers": {"Authorization": f"Bearer {token}"}}
+
+@pytest.fixture(scope="module")
+def paged_books(test_user):
+    ids = []
+    for i in range(5):
+        res = client.post("/books", json={
+            "title": f"Paged Book {4 - i}",
+            "author": "Paging Author",
+            "publication_year": 2000 + i,
+            "isbn": f"PAGED{i}",
+            "copies": 1
+        }, headers=test_user["headers"])
+        ids.append(res.json()["id"])
+    return ids
+
+def collect_pages(params):
+    items, cursor = [], None
+    while True:
+        query = dict(params, cursor=cursor) if cursor else params
+        res = client.get("/books", params=query)
+        assert res.status_code == 200
+        page = res.json()
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+def test_list_books_pages_by_id(paged_books):
+    first = client.get("/books", params={"author": "Paging Author", "limit": 2}).json()
+    assert [b["id"] for b in first["items"]] == paged_books[:2]
+    assert first["next_cursor"] is not None
+
+    items = collect_pages({"author": "Paging Author", "limit": 2})
+    assert [b["id"] for b in items] == paged_books
+
+def test_list_books_pages_by_title_desc(paged_books):
+    items = collect_pages({"author": "Paging Author", "limit": 2, "sort": "title", "order": "desc"})
+    titles = [b["title"] for b in items]
+    assert titles == sorted(titles, reverse=True)
+    assert len(items) == 5
+
+def test_list_books_filters(paged_books):
+    res = client.get("/books", params={"author": "Paging Author", "year_from": 2001, "year_to": 2003})
+    assert [b["publication_year"] for b in res.json()["items"]] == [2001, 2002, 2003]
+
+    res = client.get("/books", params={"isbn": "PAGED4"})
+    assert [b["id"] for b in res.json()["items"]] == [paged_books[4]]
+
+def test_list_books_rejects_bad_cursor_and_limit(paged_books):
+    assert client.get("/books", params={"cursor": "not-a-cursor"}).status_code == 400
+
+    cursor = client.get("/books", params={"author": "Paging Author", "limit": 1}).json()["next_cursor"]
+    res = client.get("/books", params={"cursor": cursor, "sort": "title"})
+    assert res.status_code == 400
+
+    assert client.get("/books", params={"limit": 10000}).status_code == 422
+
+@pytest.mark.parametrize("sort,position", [
+    ("title", {"value": {"a": 1}, "id": 1}),
+    ("title", {"value": "Paged", "id": [1]}),
+    ("title", {"value": "Paged", "id": "x"}),
+    ("title", {"value": 3, "id": 1}),
+    ("title", {"value": "Paged"}),
+    ("id", {"value": 1, "id": True}),
+])
+def test_list_books_rejects_cursor_values_of_the_wrong_type(paged_books, sort, position):
+    cursor = encode_cursor({"sort": sort, "order": "asc", **position})
+    res = client.get("/books", params={"cursor": cursor, "sort": sort})
+    assert res.status_code == 400
@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.core.hashing import password_hasher
+from app.models.models import User
+
+# Use test database (SQLite for simplicity)
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Create fresh DB for tests
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+# Override dependency
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+
+def test_login_rehashes_outdated_hash():
+    with Session(engine) as db:
+        weak_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("oldpass")
+        db.add(User(email="legacy@example.com", hashed_password=weak_hash))
+        db.commit()
+
+    res = client.post("/auth/login", json={"email": "legacy@example.com", "password": "oldpass"})
+    assert res.status_code == 200
+
+    with Session(engine) as db:
+        upgraded = db.scalar(select(User.hashed_password).where(User.email == "legacy@example.com"))
+    assert upgraded != weak_hash
+    assert not password_hasher.needs_update(upgraded)
+
+    res = client.post("/auth/login", json={"email": "legacy@example.com", "password": "oldpass"})
+    assert res.status_code == 200
+
+def test_saturated_hasher_fails_fast(monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    rejected = password_hasher.rejected
+
+    res = client.post("/auth/register", json={"email": "burst@example.com", "password": "burstpass"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    assert password_hasher.rejected == rejected + 1
@@ -0,0 +1,98 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.core.pool import CHECKOUT_TIMEOUTS, CHECKOUT_WAIT, MonitoredQueuePool, monitor_pool, monitored_pools, pool_options, warm_up
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "pool@example.com", "password": "poolpass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture
+def small_pool(tmp_path):
+    pooled = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.db",
+        poolclass=MonitoredQueuePool, pool_size=2, max_overflow=0, pool_timeout=0.1,
+    )
+    monitor_pool("test", pooled)
+    # Each test starts from empty checkout metrics
+    CHECKOUT_WAIT.values.pop(("test",), None)
+    CHECKOUT_TIMEOUTS.values.pop(("test",), None)
+    yield pooled
+    monitored_pools.pop("test", None)
+
+def test_pool_options_follow_the_url():
+    options = pool_options("postgresql://db/library")
+    assert options["poolclass"] is MonitoredQueuePool
+    assert {"pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping"} <= set(options)
+    assert "pool_size" not in pool_options("sqlite://")
+
+def test_warm_up_fills_the_pool(small_pool):
+    async def run():
+        opened = await warm_up(small_pool, 2)
+        stats = small_pool.sync_engine.pool.stats()
+        await small_pool.dispose()
+        return opened, stats
+    opened, stats = asyncio.run(run())
+    assert opened == 2
+    assert stats["checked_in"] == 2 and stats["checked_out"] == 0
+    assert stats["checkouts"] == 2
+
+def test_checkout_timeouts_are_counted(small_pool):
+    async def run():
+        held = [await small_pool.connect() for _ in range(2)]
+        try:
+            with pytest.raises(exc.TimeoutError):
+                await small_pool.connect()
+            return small_pool.sync_engine.pool.stats()
+        finally:
+            for connection in held:
+                await connection.close()
+            await small_pool.dispose()
+    stats = asyncio.run(run())
+    assert stats["checked_out"] == 2
+    assert stats["checkout_timeouts"] == 1
+    assert stats["checkout_wait_histogram"]["+Inf"] == stats["checkouts"]
+
+def test_dispose_keeps_the_pool_monitored(small_pool):
+    asyncio.run(small_pool.dispose())
+    assert monitored_pools["test"] is small_pool.sync_engine.pool
+
+def test_admin_pool_endpoint(small_pool, test_auth_token):
+    response = client.get("/admin/pool", headers=test_auth_token)
+    assert response.status_code == 200
+    assert response.json()["test"]["size"] == 2
+
+def test_pool_gauges_on_metrics(small_pool):
+    body = client.get("/metrics").text
+    assert 'db_pool_checked_out{pool="test"} 0' in body
@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.core import query_budget as budgets
+from app.core.metrics import MetricsMiddleware, QUERY_BUDGET_EXCEEDED
+from app.core.query_budget import QueryBudgetExceeded, count_queries, query_budget
+
+budget_engine = create_async_engine("sqlite+aiosqlite://", poolclass=NullPool)
+
+budget_app = FastAPI()
+budget_app.add_middleware(MetricsMiddleware)
+
+@budget_app.get("/items")
+@query_budget(2)
+async def list_items(n: int):
+    async with budget_engine.connect() as connection:
+        for _ in range(n):
+            await connection.execute(text("SELECT 1"))
+    return {"queries": n}
+
+budget_client = TestClient(budget_app)
+
+def test_route_within_budget_passes():
+    assert budget_client.get("/items", params={"n": 2}).status_code == 200
+
+def test_route_over_budget_fails_the_test():
+    with pytest.raises(QueryBudgetExceeded, match="GET /items ran 3 SQL statements, its budget is 2"):
+        budget_client.get("/items", params={"n": 3})
+
+def test_route_over_budget_is_counted_when_not_enforced(monkeypatch):
+    monkeypatch.setattr(budgets, "enforce", False)
+    before = QUERY_BUDGET_EXCEEDED.values.get(("GET", "/items"), 0)
+    assert budget_client.get("/items", params={"n": 3}).status_code == 200
+    assert QUERY_BUDGET_EXCEEDED.values[("GET", "/items")] == before + 1
+
+def test_count_queries():
+    async def run():
+        async with budget_engine.connect() as connection:
+            with count_queries() as counter:
+                await connection.execute(text("SELECT 1"))
+                await connection.execute(text("SELECT 2"))
+            await connection.execute(text("SELECT 3"))
+        return counter
+    counter = asyncio.run(run())
+    assert counter.count == 2
+    assert counter.statements == ["SELECT 1", "SELECT 2"]
+
+def test_query_counter_fixture(query_counter):
+    budget_client.get("/items", params={"n": 1})
+    assert query_counter.count == 1
+
+def test_every_route_declares_a_budget():
+    missing = [
+        f"{sorted(route.methods)} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute) and getattr(route.endpoint, "query_budget", None) is None
+    ]
+    assert missing == []
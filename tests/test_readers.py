@@ -0,0 +1,107 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "directory@example.com", "password": "directorypass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture(scope="module")
+def readers(test_auth_token):
+    return [
+        client.post("/readers", json={"name": f"Zyxa Reader {n}", "email": f"zyxa-{n}@example.com"}, headers=test_auth_token).json()["id"]
+        for n in range(5)
+    ]
+
+def search(headers, **params) -> list:
+    items, cursor = [], None
+    while True:
+        page = client.get("/readers", params={**params, **({"cursor": cursor} if cursor else {})}, headers=headers).json()
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+def test_search_pages_through_name_prefix_matches(readers, test_auth_token):
+    items = search(test_auth_token, q="zyxa r", limit=2)
+    assert [item["id"] for item in items] == readers
+    assert items[0] == {"id": readers[0], "name": "Zyxa Reader 0", "email": "zyxa-0@example.com", "active_borrow_count": 0}
+
+def test_search_matches_email_prefix_case_insensitively(readers, test_auth_token):
+    assert [item["id"] for item in search(test_auth_token, q="ZYXA-3@")] == [readers[3]]
+    assert len(search(test_auth_token, q="Zyxa")) == 5
+
+def test_search_treats_wildcards_literally(readers, test_auth_token):
+    assert search(test_auth_token, q="zy%") == []
+    assert search(test_auth_token, q="zyxa_") == []
+
+def test_search_handles_prefixes_ending_in_the_last_code_point(test_auth_token):
+    top = chr(0x10FFFF)
+    reader = client.post("/readers", json={"name": f"Maxcp{top}{top}", "email": "maxcp@example.com"}, headers=test_auth_token).json()
+    assert [item["id"] for item in search(test_auth_token, q=f"maxcp{top}")] == [reader["id"]]
+    assert search(test_auth_token, q=top) == []
+    assert search(test_auth_token, q=chr(0xD7FF)) == []
+
+def test_search_folds_non_ascii_case(test_auth_token):
+    reader = client.post("/readers", json={"name": "Émile Zola", "email": "zola@example.com"}, headers=test_auth_token).json()
+    for q in ("É", "é", "émile", "Émile", "ÉMILE Z"):
+        assert [item["id"] for item in search(test_auth_token, q=q)] == [reader["id"]]
+    assert search(test_auth_token, q="emile") == []
+
+@pytest.mark.parametrize("extra", [{"q": "zyxa"}, {"limit": 5}, {"cursor": "abc"}])
+def test_ids_reject_list_parameters(readers, test_auth_token, extra):
+    response = client.get("/readers", params={"ids": str(readers[0]), **extra}, headers=test_auth_token)
+    assert response.status_code == 400
+    assert next(iter(extra)) in response.json()["detail"]
+
+def test_directory_lists_all_readers_in_id_order(readers, test_auth_token):
+    ids = [item["id"] for item in search(test_auth_token, limit=3)]
+    assert ids == sorted(ids)
+    assert set(readers) <= set(ids)
+
+def test_cursor_must_match_search(readers, test_auth_token):
+    page = client.get("/readers", params={"q": "zyxa", "limit": 1}, headers=test_auth_token).json()
+    response = client.get("/readers", params={"q": "other", "cursor": page["next_cursor"]}, headers=test_auth_token)
+    assert response.status_code == 400
+
+def test_get_reader_includes_active_borrows(readers, test_auth_token):
+    book = client.post("/books", json={"title": "Directory Book", "author": "Directory Author", "copies": 2}, headers=test_auth_token).json()
+    client.post("/borrow", json={"book_id": book["id"], "reader_id": readers[1]}, headers=test_auth_token)
+
+    reader = client.get(f"/readers/{readers[1]}", headers=test_auth_token).json()
+    assert reader["active_borrow_count"] == 1
+    assert reader["name"] == "Zyxa Reader 1"
+    assert client.get("/readers/999999", headers=test_auth_token).status_code == 404
+
+def test_reader_endpoints_require_auth(readers):
+    assert client.get("/readers").status_code == 401
+    assert client.get(f"/readers/{readers[0]}").status_code == 401
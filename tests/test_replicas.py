@@ -0,0 +1,133 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+import app.database as database
+from app.main import app
+from app.database import Base, get_async_db
+from app.models.models import Book
+from app.core.replicas import ReplicaSet
+from app.core.response_cache import catalogue_cache
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+# Later test modules install their own override at import time, so it is
+# swapped in for each test here and restored afterwards
+@pytest.fixture(autouse=True)
+def primary_db():
+    previous = app.dependency_overrides.get(get_async_db)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    yield
+    app.dependency_overrides[get_async_db] = previous
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    previous = app.dependency_overrides.get(get_async_db)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    user = {"email": "replicas@example.com", "password": "replicaspass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    app.dependency_overrides[get_async_db] = previous
+    return {"Authorization": f"Bearer {token}"}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# Two SQLite files stand in for replicas; each holds a differently titled
+# copy of one book, so responses show which replica served them
+@pytest.fixture(scope="module")
+def replica_urls(tmp_path_factory):
+    urls = []
+    for name in ("A", "B"):
+        path = tmp_path_factory.mktemp("replicas") / f"replica_{name.lower()}.db"
+        sync_engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=sync_engine)
+        with Session(sync_engine) as db:
+            db.add(Book(id=1000, title=f"Replica {name}", author="Replica Author", copies=1))
+            db.commit()
+        sync_engine.dispose()
+        urls.append(f"sqlite+aiosqlite:///{path}")
+    return urls
+
+@pytest.fixture
+def replicas(replica_urls, monkeypatch):
+    replica_set = ReplicaSet([create_async_engine(url, poolclass=NullPool) for url in replica_urls], 30, FakeClock())
+    monkeypatch.setattr(database, "replicas", replica_set)
+    return replica_set
+
+def test_reads_rotate_over_replicas(replicas, test_auth_token):
+    titles = [client.get("/books/1000", headers=test_auth_token).json()["title"] for _ in range(4)]
+    assert titles == ["Replica A", "Replica B", "Replica A", "Replica B"]
+    assert replicas.stats()["reads"] == 4
+
+def test_writes_stay_on_the_primary(replicas, test_auth_token):
+    response = client.post("/books", json={"title": "Primary Only", "author": "Primary Author", "copies": 1}, headers=test_auth_token)
+    assert response.status_code == 201
+    with Session(engine) as db:
+        assert db.get(Book, response.json()["id"]).title == "Primary Only"
+    assert replicas.stats()["reads"] == 0
+    # The replicas never saw it
+    assert client.get(f"/books/{response.json()['id']}", headers=test_auth_token).status_code == 404
+
+def test_failed_replica_is_skipped_until_retry(replica_urls, monkeypatch, tmp_path):
+    clock = FakeClock()
+    broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db", poolclass=NullPool)
+    healthy = create_async_engine(replica_urls[0], poolclass=NullPool)
+    replica_set = ReplicaSet([broken, healthy], 30, clock)
+
+    async def query(chosen):
+        try:
+            async with chosen.connect() as connection:
+                return await connection.scalar(text("SELECT 1"))
+        finally:
+            # Lets aiosqlite's worker thread finish before the loop closes
+            await asyncio.sleep(0.05)
+
+    with pytest.raises(OperationalError):
+        asyncio.run(query(replica_set.choose()))
+    assert replica_set.stats()["healthy"] == 1
+    assert replica_set.choose() is healthy
+    assert replica_set.choose() is healthy
+
+    clock.now = 31
+    assert replica_set.choose() is broken
+
+def test_no_healthy_replica_falls_back_to_the_primary(replicas, test_auth_token):
+    book = client.post("/books", json={"title": "Fallback", "author": "Primary Author", "copies": 1}, headers=test_auth_token).json()
+    for index in range(len(replicas.engines)):
+        replicas.mark_down(index)
+    assert client.get(f"/books/{book['id']}", headers=test_auth_token).json()["title"] == "Fallback"
+    assert replicas.stats()["fallbacks"] == 1
+
+def test_replica_pages_are_not_cached_right_after_a_write(replicas):
+    catalogue_cache.invalidate()
+    titles = [client.get("/books", params={"author": "Replica Author"}).json()["items"][0]["title"] for _ in range(2)]
+    assert titles == ["Replica A", "Replica B"]
@@ -0,0 +1,118 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.core.response_cache import ResponseCache, LocalVersionBackend, SQLiteVersionBackend
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "cache@example.com", "password": "cachepass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def book_queries(counter):
+    return [s for s in counter.statements if "FROM books" in s]
+
+def test_list_books_served_from_cache(test_auth_token, query_counter):
+    client.post("/books", json={"title": "Cached", "author": "Cache Author", "copies": 1}, headers=test_auth_token)
+    params = {"author": "Cache Author"}
+    first = client.get("/books", params=params)
+    assert first.status_code == 200
+
+    query_counter.statements.clear()
+    second = client.get("/books", params=params)
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert book_queries(query_counter) == []
+
+    response = client.get("/books", params=params, headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+    assert book_queries(query_counter) == []
+
+def test_writes_invalidate_cache(test_auth_token):
+    params = {"author": "Invalidated Author"}
+    book = client.post("/books", json={"title": "Stale", "author": "Invalidated Author", "copies": 1}, headers=test_auth_token).json()
+    assert client.get("/books", params=params).json()["items"][0]["copies"] == 1
+
+    reader = client.post("/readers", json={"name": "Cache Reader", "email": "cache-reader@example.com"}, headers=test_auth_token).json()
+    borrow = client.post("/borrow", json={"book_id": book["id"], "reader_id": reader["id"]}, headers=test_auth_token).json()
+    assert client.get("/books", params=params).json()["items"][0]["copies"] == 0
+
+    client.post("/return", json={"borrow_id": borrow["id"]}, headers=test_auth_token)
+    assert client.get("/books", params=params).json()["items"][0]["copies"] == 1
+
+    client.put(f"/books/{book['id']}", json={"title": "Fresh", "author": "Invalidated Author", "copies": 1}, headers=test_auth_token)
+    assert client.get("/books", params=params).json()["items"][0]["title"] == "Fresh"
+
+    other = client.post("/books", json={"title": "Gone", "author": "Deleted Author", "copies": 1}, headers=test_auth_token).json()
+    assert len(client.get("/books", params={"author": "Deleted Author"}).json()["items"]) == 1
+    client.delete(f"/books/{other['id']}", headers=test_auth_token)
+    assert client.get("/books", params={"author": "Deleted Author"}).json()["items"] == []
+
+def test_cache_stats(test_auth_token):
+    assert client.get("/admin/cache").status_code == 401
+    stats = client.get("/admin/cache", headers=test_auth_token).json()
+    assert stats["catalogue"]["hits"] >= 2
+    assert stats["catalogue"]["invalidations"] >= 1
+    assert set(stats["users"]) >= {"hits", "misses", "evictions", "hit_ratio"}
+
+def test_size_bound_evicts_least_recently_used():
+    cache = ResponseCache(max_bytes=10, backend=LocalVersionBackend())
+    generation = cache.generation()
+    cache.set("a", generation, b"aaaa", '"a"')
+    cache.set("b", generation, b"bbbb", '"b"')
+    cache.get("a")
+    cache.set("c", generation, b"cccc", '"c"')
+    assert cache.get("b") is None
+    assert cache.get("a") == (b"aaaa", '"a"')
+    assert cache.stats()["size_bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+
+    # Bodies larger than the whole cache are never stored
+    cache.set("d", generation, b"d" * 11, '"d"')
+    assert cache.get("d") is None
+
+def test_entry_computed_before_write_is_dropped():
+    cache = ResponseCache(max_bytes=100, backend=LocalVersionBackend())
+    generation = cache.generation()
+    cache.invalidate()
+    cache.set("a", generation, b"old", '"a"')
+    assert cache.get("a") is None
+
+def test_sqlite_backend_invalidates_other_workers(tmp_path):
+    path = str(tmp_path / "versions.db")
+    worker_a = ResponseCache(max_bytes=100, backend=SQLiteVersionBackend(path, poll_interval=0))
+    worker_b = ResponseCache(max_bytes=100, backend=SQLiteVersionBackend(path, poll_interval=0))
+    worker_b.set("page", worker_b.generation(), b"old", '"v1"')
+    assert worker_b.get("page") is not None
+
+    worker_a.invalidate()
+    assert worker_b.get("page") is None
+    assert worker_b.stats()["invalidations"] == 1
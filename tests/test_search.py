@@ -0,0 +1,92 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+
+# Use test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Create fresh DB for tests
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+# Override DB dependency
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_user():
+    user_data = {"email": "test@example.com", "password": "testpass"}
+    client.post("/auth/register", json=user_data)
+    response = client.post("/auth/login", json=user_data)
+    token = response.json()["access_token"]
+    return {"token": token, "headers": {"Authorization": f"Bearer {token}"}}
+
+@pytest.fixture(scope="module")
+def searchable_books(test_user):
+    books = [
+        {"title": "The Quantum Garden", "author": "Searchable Writer", "isbn": "SEARCH1",
+         "description": "A story about time travel"},
+        {"title": "Gardening for Beginners", "author": "Green Thumb", "isbn": "SEARCH2",
+         "description": "Practical advice on quantum-free vegetables"},
+        {"title": "Unrelated Title", "author": "Searchable Writer", "isbn": "SEARCH3",
+         "description": None},
+    ]
+    ids = []
+    for book in books:
+        res = client.post("/books", json=book, headers=test_user["headers"])
+        ids.append(res.json()["id"])
+    return ids
+
+def search(q, **params):
+    res = client.get("/books/search", params=dict(params, q=q))
+    assert res.status_code == 200
+    return res.json()
+
+def test_search_ranks_title_matches_first(searchable_books):
+    ids = [b["id"] for b in search("quantum")["items"]]
+    assert ids == [searchable_books[0], searchable_books[1]]
+
+def test_search_matches_prefixes_and_all_terms(searchable_books):
+    assert [b["id"] for b in search("garden")["items"]] == searchable_books[:2]
+    assert sorted(b["id"] for b in search("searchable writer")["items"]) == [searchable_books[0], searchable_books[2]]
+    assert search("garden unrelated")["items"] == []
+    assert search("\"*)(")["items"] == []
+
+def test_search_index_follows_updates_and_deletes(test_user, searchable_books):
+    book_id = searchable_books[2]
+    client.put(f"/books/{book_id}", json={
+        "title": "Zeppelin Atlas", "author": "Searchable Writer", "isbn": "SEARCH3"
+    }, headers=test_user["headers"])
+    assert [b["id"] for b in search("zeppelin")["items"]] == [book_id]
+    assert search("unrelated")["items"] == []
+
+    client.delete(f"/books/{book_id}", headers=test_user["headers"])
+    assert search("zeppelin")["items"] == []
+
+def test_search_paginates(searchable_books):
+    first = search("garden", limit=1)
+    assert len(first["items"]) == 1
+    second = search("garden", limit=1, cursor=first["next_cursor"])
+    assert [first["items"][0]["id"], second["items"][0]["id"]] == searchable_books[:2]
+    assert second["next_cursor"] is None
+
+    res = client.get("/books/search", params={"q": "other", "cursor": first["next_cursor"]})
+    assert res.status_code == 400
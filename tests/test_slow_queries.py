@@ -0,0 +1,91 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.core.slow_queries import SlowQueryLog, parameter_shape
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+@pytest.fixture
+def slow_log(tmp_path):
+    # Threshold 0 makes every statement slow
+    log = SlowQueryLog(async_engine, threshold_ms=0, path=str(tmp_path / "slow.log"),
+                       max_bytes=1024 * 1024, backups=1, sample_seconds=60).install()
+    previous = app.dependency_overrides.get(get_async_db)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    yield log, tmp_path / "slow.log"
+    app.dependency_overrides[get_async_db] = previous
+    log.close()
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_slow_statement_is_logged_with_route_and_plan(slow_log):
+    log, path = slow_log
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Different limits: the same statement, but no catalogue cache hit
+            for limit in (7, 8):
+                response = await client.get("/books", params={"author": "Slow Author", "limit": limit})
+                assert response.status_code == 200
+                await log.drain()
+    asyncio.run(run())
+
+    records = [r for r in read_records(path) if "FROM books" in r["sql"]]
+    first, second = records[0], records[1]
+    assert first["route"] == "/books"
+    assert first["duration_ms"] >= 0
+    assert "Slow Author" not in json.dumps(first)
+    assert first["params"][0] == "str"
+    assert first["plan"] and first["plan_id"]
+    # The second run is inside the sampling window: no second EXPLAIN, and the
+    # plan is only referenced
+    assert "plan" not in second
+    assert second["plan_id"] == first["plan_id"]
+    assert not any(r["sql"].startswith("EXPLAIN") for r in read_records(path))
+
+def test_unchanged_plan_is_not_repeated(slow_log):
+    log, path = slow_log
+    log.sample_seconds = 0
+
+    async def run():
+        async with async_engine.connect() as connection:
+            for _ in range(2):
+                await connection.execute(text("SELECT id FROM books WHERE isbn = :isbn"), {"isbn": "x"})
+                await log.drain()
+    asyncio.run(run())
+
+    records = [r for r in read_records(path) if r["sql"].startswith("SELECT id FROM books")]
+    assert len(records) == 2
+    assert "plan" in records[0]
+    assert "plan" not in records[1]
+    assert records[0]["plan_id"] == records[1]["plan_id"]
+    assert records[0]["route"] is None
+
+def test_parameter_shape():
+    assert parameter_shape({"a": 1, "b": "x"}) == {"a": "int", "b": "str"}
+    assert parameter_shape((1, None)) == ["int", "NoneType"]
+    assert parameter_shape([(1,), (2,)], executemany=True) == {"rows": 2, "row": ["int"]}
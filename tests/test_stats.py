@@ -0,0 +1,125 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, delete, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.models.models import BookBorrowStats, DailyBorrowStats, ReaderBorrowStats
+from app.core.analytics import rebuild_stats, stats_day
+from app.core.archive import archive_returned_borrows
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_auth_token():
+    user = {"email": "stats@example.com", "password": "statspass"}
+    client.post("/auth/register", json=user)
+    login = client.post("/auth/login", json=user)
+    token = login.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def run(job, **kwargs):
+    async def go():
+        async with TestingSessionLocal() as db:
+            return await job(db, **kwargs)
+    return asyncio.run(go())
+
+def snapshot():
+    with Session(engine) as db:
+        return (
+            sorted(db.execute(select(BookBorrowStats.book_id, BookBorrowStats.borrow_count)).all()),
+            sorted(db.execute(select(ReaderBorrowStats.reader_id, ReaderBorrowStats.borrow_count)).all()),
+            sorted(db.execute(
+                select(DailyBorrowStats.day, DailyBorrowStats.shard, DailyBorrowStats.borrows, DailyBorrowStats.returns)
+            ).all()),
+        )
+
+def today(headers) -> dict:
+    return client.get("/stats/daily", params={"days": 1}, headers=headers).json()[0]
+
+@pytest.fixture(scope="module")
+def activity(test_auth_token):
+    before = today(test_auth_token)
+    book = client.post("/books", json={"title": "Popular", "author": "Stats Author", "copies": 5}, headers=test_auth_token).json()
+    readers = [
+        client.post("/readers", json={"name": f"Stats Reader {n}", "email": f"stats-reader-{n}@example.com"}, headers=test_auth_token).json()["id"]
+        for n in range(2)
+    ]
+    borrow = client.post("/borrow", json={"book_id": book["id"], "reader_id": readers[0]}, headers=test_auth_token).json()
+    client.post("/return", json={"borrow_id": borrow["id"]}, headers=test_auth_token)
+    batch = client.post("/borrow/batch", json=[
+        {"book_id": book["id"], "reader_id": readers[0]},
+        {"book_id": book["id"], "reader_id": readers[1]},
+        {"book_id": book["id"], "reader_id": readers[1]},
+    ], headers=test_auth_token).json()
+    client.post("/return/batch", json=[{"borrow_id": batch[0]["borrow"]["id"]}], headers=test_auth_token)
+    return {"before": before, "book_id": book["id"], "readers": readers}
+
+def test_borrow_and_return_update_daily_counts(activity, test_auth_token):
+    after = today(test_auth_token)
+    assert after["borrows"] - activity["before"]["borrows"] == 4
+    assert after["returns"] - activity["before"]["returns"] == 2
+
+def test_daily_fills_days_without_activity(test_auth_token):
+    days = client.get("/stats/daily", params={"days": 7}, headers=test_auth_token).json()
+    assert [day["day"] for day in days] == [(date.today() - timedelta(days=n)).isoformat() for n in range(6, -1, -1)]
+    assert all(day["borrows"] >= 0 and day["returns"] >= 0 for day in days)
+
+def test_top_books_and_readers(activity, test_auth_token):
+    books = client.get("/stats/books/top", params={"limit": 100}, headers=test_auth_token).json()
+    assert [b["borrow_count"] for b in books] == sorted((b["borrow_count"] for b in books), reverse=True)
+    popular = next(b for b in books if b["book_id"] == activity["book_id"])
+    assert popular == {"book_id": activity["book_id"], "title": "Popular", "author": "Stats Author", "borrow_count": 4}
+
+    readers = client.get("/stats/readers/top", params={"limit": 100}, headers=test_auth_token).json()
+    counts = {r["reader_id"]: r["borrow_count"] for r in readers}
+    assert [counts[reader_id] for reader_id in activity["readers"]] == [2, 2]
+
+def test_rebuild_matches_incremental_stats(activity):
+    # Archived borrows are still counted
+    run(archive_returned_borrows)
+    incremental = snapshot()
+    assert run(rebuild_stats, batch_size=3) > 0
+    assert snapshot() == incremental
+
+def test_rebuild_corrects_drifted_stats(activity):
+    expected = snapshot()
+    with Session(engine) as db:
+        db.execute(update(BookBorrowStats).where(BookBorrowStats.book_id == activity["book_id"]).values(borrow_count=99))
+        db.execute(delete(ReaderBorrowStats).where(ReaderBorrowStats.reader_id == activity["readers"][0]))
+        db.add(DailyBorrowStats(day=date.today() - timedelta(days=400), shard=0, borrows=3, returns=1))
+        db.commit()
+    run(rebuild_stats, batch_size=2, days_per_batch=7)
+    assert snapshot() == expected
+
+def test_stats_day_uses_local_dates():
+    local = datetime(2026, 3, 1, 23, 30)
+    assert stats_day(local) == date(2026, 3, 1)
+    assert stats_day(local.astimezone(timezone.utc)) == date(2026, 3, 1)
+
+def test_stats_require_auth():
+    assert client.get("/stats/books/top").status_code == 401
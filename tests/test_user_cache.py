@@ -0,0 +1,127 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.database import Base, get_async_db
+from app.core.cache import TTLCache
+from app.core.response_cache import SQLiteVersionBackend
+from app.dependencies.dependencies import user_cache
+from app.models.models import User
+
+# Use test database
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# TestClient runs each request on a fresh event loop, so async connections are not pooled
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Create fresh DB for tests
+Base.metadata.drop_all(bind=engine)
+Base.metadata.create_all(bind=engine)
+
+# Override DB dependency
+async def override_get_async_db():
+    async with TestingSessionLocal() as db:
+        yield db
+
+app.dependency_overrides[get_async_db] = override_get_async_db
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def cache_user():
+    user_data = {"email": "cached@example.com", "password": "cachepass"}
+    token = client.post("/auth/register", json=user_data).json()["access_token"]
+    book = client.post("/books", json={
+        "title": "Cached Book", "author": "Cache Author", "isbn": "CACHED1"
+    }, headers={"Authorization": f"Bearer {token}"}).json()
+    return {"headers": {"Authorization": f"Bearer {token}"}, "book_id": book["id"]}
+
+def test_warm_cache_skips_user_lookup(cache_user, query_counter):
+    client.get(f"/books/{cache_user['book_id']}", headers=cache_user["headers"])
+    hits = user_cache.hits
+    query_counter.statements.clear()
+
+    res = client.get(f"/books/{cache_user['book_id']}", headers=cache_user["headers"])
+    assert res.status_code == 200
+    assert user_cache.hits == hits + 1
+    assert query_counter.count == 1
+    assert "FROM users" not in query_counter.statements[0]
+
+def test_user_changes_invalidate_cache(cache_user):
+    client.get(f"/books/{cache_user['book_id']}", headers=cache_user["headers"])
+    assert user_cache.get(cache_user["headers"]["Authorization"].split()[1]) is not None
+
+    with Session(engine) as db:
+        user = db.scalar(select(User).where(User.email == "cached@example.com"))
+        db.delete(user)
+        db.commit()
+
+    res = client.get(f"/books/{cache_user['book_id']}", headers=cache_user["headers"])
+    assert res.status_code == 401
+
+def test_lookup_between_flush_and_commit_is_not_cached_stale():
+    user_data = {"email": "racing@example.com", "password": "racepass"}
+    headers = {"Authorization": f"Bearer {client.post('/auth/register', json=user_data).json()['access_token']}"}
+    assert client.get("/books/1", headers=headers).status_code != 401
+
+    with Session(engine) as db:
+        db.delete(db.scalar(select(User).where(User.email == "racing@example.com")))
+        db.flush()
+        # A request in another worker reads the still committed row meanwhile
+        user_cache.clear()
+        assert client.get("/books/1", headers=headers).status_code != 401
+        db.commit()
+
+    assert client.get("/books/1", headers=headers).status_code == 401
+
+def test_bulk_user_updates_invalidate_cache():
+    user_data = {"email": "renamed@example.com", "password": "renamepass"}
+    headers = {"Authorization": f"Bearer {client.post('/auth/register', json=user_data).json()['access_token']}"}
+    client.get("/books/1", headers=headers)
+    generation = user_cache.generation()
+
+    with Session(engine) as db:
+        db.execute(update(User).where(User.email == "renamed@example.com").values(email="renamed-later@example.com"))
+        db.commit()
+
+    assert user_cache.generation() != generation
+    assert client.get("/books/1", headers=headers).status_code == 401
+
+def test_invalidation_reaches_caches_sharing_a_backend(tmp_path):
+    path = str(tmp_path / "versions.db")
+    ours = TTLCache(maxsize=10, ttl=60, backend=SQLiteVersionBackend(path, "users", poll_interval=0))
+    theirs = TTLCache(maxsize=10, ttl=60, backend=SQLiteVersionBackend(path, "users", poll_interval=0))
+    ours.set("token", "identity")
+    assert ours.get("token") == "identity"
+    theirs.invalidate()
+    assert ours.get("token") is None
+
+def test_invalid_token_is_not_cached():
+    misses = user_cache.misses
+    res = client.get("/books/1", headers={"Authorization": "Bearer not-a-token"})
+    assert res.status_code == 401
+    assert user_cache.misses == misses + 1
+    assert user_cache.get("not-a-token") is None
+
+def test_ttl_cache_evicts_least_recently_used_and_expired():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+    cache.set("d", 4, ttl=0)
+    assert cache.get("d") is None